@@ -0,0 +1,239 @@
+"""Benchmark suite for simulation throughput and rendering cost.
+
+Every benchmark uses fixed seeds and reports a cost, so lower is always
+better. Rendering runs offscreen through SDL's dummy video driver, so the
+suite works on a headless build box and gives the same numbers on every
+run of the same machine.
+
+    python bench.py                          # print results
+    python bench.py --save bench_baseline.json
+    python bench.py --compare bench_baseline.json [--tolerance 0.25]
+
+--compare exits with status 1 if any benchmark got slower than the
+baseline by more than the tolerance.
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import sys
+import time
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+from topology import TOPOLOGY
+
+SEED = 1
+FRAME_VEHICLES = [10, 100, 1000, 5000]
+UPDATE_VEHICLES = [10, 100, 1000, 5000]
+QUEUE_LENGTHS = [10, 1000, 100_000, 1_000_000]
+
+
+def best_of(function, repeats=3):
+    """Smallest wall time of repeats calls, in seconds"""
+    best = None
+    for _ in range(repeats):
+        start = time.perf_counter()
+        function()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def bench_headless(results, hours=6):
+    from engine import JunctionSimulation
+
+    def run():
+        sim = JunctionSimulation(seed=SEED, arrival_rate=450)
+        sim.run(hours * 3600)
+        run.departed = sim.departed
+
+    elapsed = best_of(run)
+    results["headless_us_per_vehicle"] = elapsed / run.departed * 1e6
+    print(f"headless: {run.departed / elapsed:,.0f} simulated vehicles/s")
+
+
+def bench_dequeue(results):
+    from bench_queue import time_dequeue
+    from lane_queue import Queue
+    for queued in QUEUE_LENGTHS:
+        cost = min(time_dequeue(Queue, queued, 10_000) for _ in range(3))
+        results[f"dequeue_us@{queued}"] = cost * 1e6
+
+
+def moving_vehicles(simulator, count, rng):
+    """count Vehicles spread along random routes, not yet in any batch"""
+    vehicles = []
+    lanes = sorted(TOPOLOGY.incoming)
+    for i in range(count):
+        from_lane = rng.choice(lanes)
+        to_lane = TOPOLOGY.choose(from_lane, rng)
+        vehicle = simulator.Vehicle(from_lane, f"{from_lane}_{i}", simulator.car1_img)
+        vehicle.create_path(from_lane, to_lane)
+        vehicle.path_index = rng.randrange(len(vehicle.path) - 4)
+        vehicle.pos = list(vehicle.path[vehicle.path_index])
+        vehicles.append(vehicle)
+    return vehicles
+
+
+def add_to_batch(batch, vehicle):
+    """MovementBatch.add, keeping the vehicle's progress along its path"""
+    progress = vehicle.path_index
+    batch.add(vehicle)
+    batch.path_index[vehicle.batch_slot] += progress
+
+
+def bench_update(results, simulator, steps=20):
+    for count in UPDATE_VEHICLES:
+        vehicles = moving_vehicles(simulator, count, random.Random(SEED))
+        positions = [(v.pos[:], v.path_index) for v in vehicles]
+
+        def loop():
+            for (pos, index), v in zip(positions, vehicles):
+                v.pos, v.path_index, v.moving = pos[:], index, True
+            for _ in range(steps):
+                for v in vehicles:
+                    v.update()
+
+        results[f"update_us_per_vehicle@{count}"] = best_of(loop) / steps / count * 1e6
+
+        if simulator.movement_batch is None:
+            continue
+        from movement import MovementBatch
+
+        best = None
+        for _ in range(3):
+            batch = MovementBatch(simulator.path_table,
+                                  speed=simulator.VEHICLE_SPEED * simulator.SIM_DT)
+            for v in moving_vehicles(simulator, count, random.Random(SEED)):
+                add_to_batch(batch, v)
+            start = time.perf_counter()
+            for _ in range(steps):
+                batch.step()
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        results[f"batch_step_us_per_vehicle@{count}"] = best / steps / count * 1e6
+
+
+def bench_draw(results, simulator, calls=5000):
+    import pygame
+    rng = random.Random(SEED)
+    vehicles = moving_vehicles(simulator, 100, rng)
+    for v in vehicles:
+        v.rotation = rng.uniform(0, 360)
+    surface = simulator.screen
+
+    def draw():
+        for i in range(calls):
+            vehicles[i % len(vehicles)].draw(surface)
+
+    draw()  # warm the rotation cache
+    results["vehicle_draw_us"] = best_of(draw) / calls * 1e6
+
+    image = simulator.car1_img
+    angles = [rng.uniform(0, 360) for _ in range(calls)]
+
+    def rotate():
+        for angle in angles:
+            pygame.transform.rotate(image, angle)
+
+    results["transform_rotate_us"] = best_of(rotate) / calls * 1e6
+
+
+def bench_frames(results, simulator, frames=30):
+    state = simulator.state
+    for count in FRAME_VEHICLES:
+        state.reset()
+        simulator.move_events.clear()
+        if simulator.movement_batch is not None:
+            simulator.movement_batch.clear()
+        for v in moving_vehicles(simulator, count, random.Random(SEED)):
+            # Through the queue, so the snapshot sees it as a crossing vehicle
+            v.vehicle_id = state.add_vehicle(v.lane_id, lambda vehicle_id: v)
+            state.pop_vehicle(v.lane_id, 0.0)
+            if simulator.movement_batch is not None:
+                add_to_batch(simulator.movement_batch, v)
+
+        times = []
+        for _ in range(frames):
+            start = time.perf_counter()
+            snapshot, alpha = simulator.advance(simulator.SIM_DT)
+            simulator.render(snapshot, alpha)
+            times.append(time.perf_counter() - start)
+        times.sort()
+        results[f"frame_ms@{count}"] = times[len(times) // 2] * 1000
+    state.reset()
+
+
+def run_all():
+    random.seed(SEED)
+    results = {}
+    bench_headless(results)
+    bench_dequeue(results)
+
+    import simulator
+    simulator.init_simulation()
+    simulator.init_display()
+    bench_update(results, simulator)
+    bench_draw(results, simulator)
+    bench_frames(results, simulator)
+    return results
+
+
+def compare(results, baseline, tolerance):
+    """Print new vs baseline; return the names that regressed"""
+    regressions = []
+    print(f"{'benchmark':36} {'baseline':>10} {'now':>10} {'ratio':>7}")
+    for name, value in results.items():
+        old = baseline.get(name)
+        if not old:
+            print(f"{name:36} {'-':>10} {value:10.3f}")
+            continue
+        ratio = value / old
+        flag = ""
+        if ratio > 1 + tolerance:
+            flag = "  REGRESSION"
+            regressions.append(name)
+        print(f"{name:36} {old:10.3f} {value:10.3f} {ratio:6.2f}x{flag}")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Junction simulator benchmarks")
+    parser.add_argument("--save", metavar="FILE", help="write results as a new baseline")
+    parser.add_argument("--compare", metavar="FILE", help="compare against a saved baseline")
+    parser.add_argument("--tolerance", type=float, default=0.25,
+                        help="allowed slowdown before a benchmark counts as a regression")
+    args = parser.parse_args(argv)
+
+    results = run_all()
+
+    regressions = []
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)["results"]
+        regressions = compare(results, baseline, args.tolerance)
+    else:
+        for name, value in results.items():
+            print(f"{name:36} {value:10.3f}")
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump({
+                "python": platform.python_version(),
+                "machine": platform.machine(),
+                "created": time.strftime("%Y-%m-%d %H:%M:%S"),
+                "results": results,
+            }, f, indent=2)
+        print(f"Saved baseline to {args.save}")
+
+    if regressions:
+        print(f"{len(regressions)} benchmark(s) slower than baseline")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
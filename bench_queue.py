@@ -0,0 +1,42 @@
+"""Microbenchmark: list.pop(0) lane queue vs the ring-buffer Queue.
+
+Fills a lane to N vehicles and then times dequeue/enqueue pairs so the
+queue length stays at N while we measure.
+
+    python bench_queue.py
+"""
+import time
+
+from lane_queue import Queue
+
+
+class ListQueue:
+    """The original list-backed lane queue"""
+
+    def __init__(self):
+        self.queue = []
+
+    def enqueue(self, element):
+        self.queue.append(element)
+
+    def dequeue(self):
+        return self.queue.pop(0) if self.queue else None
+
+
+def time_dequeue(queue_class, queued, operations=1000):
+    q = queue_class()
+    for i in range(queued):
+        q.enqueue(i)
+    start = time.perf_counter()
+    for i in range(operations):
+        q.enqueue(q.dequeue())
+    return (time.perf_counter() - start) / operations
+
+
+if __name__ == "__main__":
+    print(f"{'queued':>10} {'list (us/op)':>14} {'ring (us/op)':>14} {'speedup':>9}")
+    for queued in [10_000, 1_000_000]:
+        list_cost = time_dequeue(ListQueue, queued)
+        ring_cost = time_dequeue(Queue, queued)
+        print(f"{queued:>10} {list_cost * 1e6:>14.3f} {ring_cost * 1e6:>14.3f} "
+              f"{list_cost / ring_cost:>8.1f}x")
@@ -0,0 +1,136 @@
+"""Compare signal controllers headlessly against the fixed-time plan.
+
+Every controller runs the same seeds at each arrival rate on a process
+pool, and the table reports, averaged over seeds, the vehicles served
+per hour, the mean and 95th percentile wait, the mean green length and
+the share of time a green was wasted: its lanes empty while another
+phase had vehicles queued.
+
+    python compare_controllers.py --arrival-rate 300 450 600 --seeds 10 --hours 6
+
+The fixed controller is the AL2 priority logic the simulator runs; it
+always runs, as the baseline of the "p95 vs fixed" column.
+"""
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from controllers import CONTROLLERS
+from engine import JunctionSimulation
+
+
+class WastedGreenSimulation(JunctionSimulation):
+    """Also measures green time with empty green lanes and a queue elsewhere"""
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.wasted_green = 0.0
+        self.wasted_since = None
+
+    def check_wasted(self):
+        scheduler = self.scheduler
+        green = self.green_phase
+        wasted = (green is not None and scheduler.waiting(green.name) == 0
+                  and any(scheduler.waiting(name) for name in scheduler.phases
+                          if name != green.name))
+        if wasted and self.wasted_since is None:
+            self.wasted_since = self.engine.now
+        elif not wasted and self.wasted_since is not None:
+            self.wasted_green += self.engine.now - self.wasted_since
+            self.wasted_since = None
+
+    def start_phase(self):
+        super().start_phase()
+        self.check_wasted()
+
+    def enqueue(self, lane_name):
+        vehicle = super().enqueue(lane_name)
+        self.check_wasted()
+        return vehicle
+
+    def release(self, arm):
+        super().release(arm)
+        self.check_wasted()
+
+    def wasted_share(self):
+        wasted = self.wasted_green
+        if self.wasted_since is not None:
+            wasted += self.engine.now - self.wasted_since
+        return wasted / self.engine.now if self.engine.now else 0.0
+
+
+def run_one(config):
+    sim = WastedGreenSimulation(seed=config["seed"], arrival_rate=config["arrival_rate"],
+                                controller=CONTROLLERS[config["controller"]]())
+    sim.run(config["hours"] * 3600)
+    result = sim.summary()
+    waits = result["waits"]["ALL"]
+    phases = sum(p["count"] for p in result["phases"].values())
+    return {
+        "controller": config["controller"],
+        "arrival_rate": config["arrival_rate"],
+        "vehicles_per_hour": result["vehicles_per_hour"],
+        "mean_wait": waits["mean"],
+        "p95_wait": waits["p95"],
+        "mean_green": result["sim_time"] / phases if phases else 0.0,
+        "wasted_green": sim.wasted_share(),
+    }
+
+
+def average(rows):
+    """One row per (controller, arrival_rate), averaged over seeds"""
+    groups = {}
+    for row in rows:
+        groups.setdefault((row["arrival_rate"], row["controller"]), []).append(row)
+    table = []
+    for (rate, controller), runs in groups.items():
+        averaged = {"controller": controller, "arrival_rate": rate}
+        for key in ("vehicles_per_hour", "mean_wait", "p95_wait", "mean_green", "wasted_green"):
+            averaged[key] = sum(run[key] for run in runs) / len(runs)
+        table.append(averaged)
+    return table
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare signal controllers headlessly")
+    parser.add_argument("--controllers", nargs="+", choices=sorted(CONTROLLERS),
+                        default=["fixed", "actuated", "max-pressure"],
+                        help="fixed is always run as the baseline")
+    parser.add_argument("--arrival-rate", type=float, nargs="+", default=[300, 450, 600],
+                        help="vehicles per hour per incoming lane")
+    parser.add_argument("--seeds", type=int, default=5, help="runs per controller and rate")
+    parser.add_argument("--hours", type=float, default=6)
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    args = parser.parse_args(argv)
+    controllers = [name for name in args.controllers if name != "fixed"]
+    controllers.insert(0, "fixed")
+
+    configs = [{"controller": controller, "arrival_rate": rate, "seed": seed,
+                "hours": args.hours}
+               for rate in args.arrival_rate
+               for controller in controllers
+               for seed in range(args.seeds)]
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=args.workers) as pool:
+        rows = list(pool.map(run_one, configs))
+    elapsed = time.perf_counter() - start
+
+    print(f"{len(configs)} runs of {args.hours:g} h in {elapsed:.1f} s")
+    print(f"{'rate/h':>7} {'controller':14} {'veh/h':>8} {'mean wait':>10} "
+          f"{'p95 wait':>9} {'green s':>8} {'wasted green':>13} {'p95 vs fixed':>13}")
+    table = average(rows)
+    baseline = {row["arrival_rate"]: row for row in table if row["controller"] == "fixed"}
+    for row in table:
+        fixed = baseline[row["arrival_rate"]]
+        change = "-"
+        if row is not fixed and fixed["p95_wait"]:
+            change = f"{row['p95_wait'] / fixed['p95_wait'] - 1:+.0%}"
+        print(f"{row['arrival_rate']:7.0f} {row['controller']:14} "
+              f"{row['vehicles_per_hour']:8.0f} {row['mean_wait']:10.1f} "
+              f"{row['p95_wait']:9.1f} {row['mean_green']:8.1f} {row['wasted_green']:13.0%} "
+              f"{change:>13}")
+
+
+if __name__ == "__main__":
+    main()
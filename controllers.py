@@ -0,0 +1,105 @@
+"""Signal controllers: how long each phase stays green and what comes next.
+
+A controller works on a PhaseScheduler, so the same controller runs the
+headless engine and the visualizer. At the start of a phase the caller
+asks next_phase(scheduler) for the phase and green_time(...) for its
+first green interval. When that runs out it asks extend(...), with the
+seconds the phase has been green so far, for how much longer to hold it;
+0 ends the phase there.
+
+FixedTimeController is the original plan: phases in the scheduler's
+order with AL2 priority, each green sized once at its start from the
+queues and never changed. The others react to the live queue:
+
+* ActuatedController keeps the same phase order but runs a short minimum
+  green and then extends in small steps while the green lanes still have
+  vehicles queued. It gaps out as soon as they are empty and another
+  phase is waiting, so no green is spent on an empty approach.
+* MaxPressureController holds a green while no other phase has more
+  vehicles queued behind its green lanes, and when another phase has
+  more, or the green reaches max_green, switches to the phase with the
+  most among the others. Like the scheduler it never serves a phase
+  twice in a row, so with two phases it still alternates and only the
+  green lengths follow the queues. At an isolated junction the exits
+  never back up, so a phase's pressure is its upstream queue. Active
+  priority rules come first.
+
+Both adaptive controllers cap a green at max_green so no phase waits
+forever.
+"""
+
+
+class FixedTimeController:
+    """Green sized at the start of the phase: time_per_vehicle per queued vehicle"""
+
+    def __init__(self, min_green=8, time_per_vehicle=1):
+        self.min_green = min_green
+        self.time_per_vehicle = time_per_vehicle
+
+    def next_phase(self, scheduler):
+        return scheduler.next_phase()
+
+    def green_time(self, scheduler, phase, rule):
+        return max(self.min_green,
+                   scheduler.vehicles_to_serve(phase, rule) * self.time_per_vehicle)
+
+    def extend(self, scheduler, phase, elapsed):
+        return 0
+
+
+class ActuatedController(FixedTimeController):
+    """Minimum green, then extension steps until the green lanes gap out"""
+
+    def __init__(self, min_green=5, max_green=40, extension=2.0):
+        super().__init__(min_green)
+        self.max_green = max_green
+        self.extension = extension
+
+    def green_time(self, scheduler, phase, rule):
+        return self.min_green
+
+    def others_waiting(self, scheduler, phase):
+        return any(scheduler.waiting(name) for name in scheduler.phases if name != phase.name)
+
+    def extend(self, scheduler, phase, elapsed):
+        if elapsed + self.extension > self.max_green:
+            return 0
+        if scheduler.waiting(phase.name) == 0 and self.others_waiting(scheduler, phase):
+            return 0
+        return self.extension
+
+
+class MaxPressureController(ActuatedController):
+    """Hold the green while it has the longest queue, then serve the longest other"""
+
+    def __init__(self, min_green=5, max_green=60, extension=2.0):
+        super().__init__(min_green, max_green, extension)
+
+    def pressure(self, scheduler, name):
+        """(active priority rule, queued vehicles), compared as a tuple"""
+        return (scheduler.active_rule(name) is not None, scheduler.waiting(name))
+
+    def next_phase(self, scheduler):
+        candidates = [name for name in scheduler.phases if name != scheduler.current]
+        if not candidates:
+            return scheduler.next_phase()
+        # Ties go to the phase that has waited longest for its turn
+        best = max(candidates, key=lambda name: (self.pressure(scheduler, name),
+                                                 -scheduler.turns[name]))
+        return scheduler.select(best)
+
+    def extend(self, scheduler, phase, elapsed):
+        if elapsed + self.extension > self.max_green:
+            return 0
+        own = self.pressure(scheduler, phase.name)
+        for name in scheduler.phases:
+            if name != phase.name and self.pressure(scheduler, name) > own:
+                return 0
+        return self.extension
+
+
+CONTROLLERS = {
+    "fixed": FixedTimeController,
+    "actuated": ActuatedController,
+    "max-pressure": MaxPressureController,
+}
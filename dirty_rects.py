@@ -0,0 +1,90 @@
+"""Dirty-rectangle renderer for low-power displays.
+
+Instead of blitting the whole background and flipping the full screen
+every frame, only regions that changed are restored from the background,
+redrawn and pushed with pygame.display.update(rects):
+
+* sprites (vehicles) whose image or rect changed, at their old and new
+  rects, plus sprites that appeared or disappeared;
+* any rect the caller marks, e.g. lights that flipped or HUD cells whose
+  numbers changed.
+
+Each dirty rect is redrawn with the clip set to it: background first,
+then draw_underlay (lights), the sprites that overlap it, and finally
+draw_overlay (HUD), so layering matches a full redraw.
+"""
+import pygame
+
+
+class DirtyRectRenderer:
+    def __init__(self, screen, background):
+        self.screen = screen
+        self.background = background
+        self.sprites = {}
+        self.dirty = []
+        self.full_redraw = True
+
+    def invalidate(self):
+        """Redraw and update the whole screen on the next frame"""
+        self.full_redraw = True
+
+    def mark(self, rect):
+        self.dirty.append(pygame.Rect(rect))
+
+    def render(self, sprites, draw_underlay, draw_overlay):
+        """Draw one frame. sprites is a list of (key, image, rect)."""
+        screen = self.screen
+        previous = self.sprites
+        current = {}
+        dirty = self.dirty
+        self.dirty = []
+
+        for key, image, rect in sprites:
+            current[key] = (image, rect)
+            old = previous.pop(key, None)
+            if old is None:
+                dirty.append(rect)
+            elif old[0] is not image or old[1] != rect:
+                dirty.append(old[1])
+                dirty.append(rect)
+        for image, rect in previous.values():
+            dirty.append(rect)
+        self.sprites = current
+
+        if self.full_redraw:
+            self.full_redraw = False
+            screen.blit(self.background, (0, 0))
+            draw_underlay()
+            for key, image, rect in sprites:
+                screen.blit(image, rect)
+            draw_overlay()
+            pygame.display.flip()
+            return
+
+        if not dirty:
+            return
+
+        dirty = merge_rects(dirty)
+        sprite_rects = [rect for key, image, rect in sprites]
+        for area in dirty:
+            screen.set_clip(area)
+            screen.blit(self.background, area, area)
+            draw_underlay()
+            for i in area.collidelistall(sprite_rects):
+                screen.blit(sprites[i][1], sprite_rects[i])
+            draw_overlay()
+        screen.set_clip(None)
+        pygame.display.update(dirty)
+
+
+def merge_rects(rects):
+    """Union overlapping rects so shared pixels are only redrawn once"""
+    merged = []
+    for rect in rects:
+        rect = pygame.Rect(rect)
+        i = rect.collidelist(merged)
+        while i != -1:
+            rect.union_ip(merged.pop(i))
+            i = rect.collidelist(merged)
+        merged.append(rect)
+    return merged
@@ -0,0 +1,185 @@
+"""Binary event traces: record a run once, replay or scrub it later.
+
+A trace file is a small header followed by fixed-size records, the same
+16-byte RECORD that shm_channel.py sends between processes:
+
+    offset  0  magic b"TJT1", record size u32, topology u32
+    offset 16  records, in time order
+
+    RECORD: timestamp f64, kind u8, lane u8, to_lane u8, pad, vehicle u32
+
+Lane and arm codes are indices into the topology the run used, and the
+header holds its fingerprint, so a reader given a different junction
+config refuses the trace (traces from before the fingerprint have 0
+there and are not checked).
+
+Kinds are ARRIVAL, MOVE and LIGHTS from shm_channel.py plus PRIORITY
+(lane is the priority rule's index in the topology, to_lane is 1 when
+the rule switches on and 0 when it switches off).
+
+TraceWriter buffers records and appends them in large writes, so a 24 h
+headless run costs a few megabytes and no per-event I/O. TraceReader
+memory-maps the file; records are found by index or by timestamp with a
+binary search, so any moment of a long trace is reachable without
+reading everything before it.
+
+    python engine.py --hours 24 --seed 1 --trace day.trace
+    python event_trace.py day.trace --start 3600 --end 3660
+    python simulator.py --replay day.trace --seek 28800
+"""
+import mmap
+import struct
+
+from shm_channel import RECORD, ARRIVAL, MOVE, LIGHTS
+from shm_channel import check_topology, encode_lights, decode_lights
+from topology import TOPOLOGY
+
+
+PRIORITY = 4
+
+HEADER = struct.Struct("<4sII")
+MAGIC = b"TJT1"
+HEADER_SIZE = 16
+TIMESTAMP = struct.Struct("<d")
+
+KIND_NAMES = {ARRIVAL: "ARRIVAL", MOVE: "MOVE", LIGHTS: "LIGHTS", PRIORITY: "PRIORITY"}
+
+
+class TraceWriter:
+    def __init__(self, path, topology=TOPOLOGY, buffer_records=4096):
+        check_topology(topology)
+        self.topology = topology
+        self.file = open(path, "wb")
+        self.file.write(HEADER.pack(MAGIC, RECORD.size, topology.fingerprint)
+                        .ljust(HEADER_SIZE, b"\0"))
+        self.buffer = bytearray(buffer_records * RECORD.size)
+        self.used = 0
+        self.count = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def write(self, kind, timestamp, lane=0, to_lane=0, vehicle=0):
+        if self.used == len(self.buffer):
+            self.flush()
+        RECORD.pack_into(self.buffer, self.used, timestamp, kind, lane, to_lane, vehicle)
+        self.used += RECORD.size
+        self.count += 1
+
+    def arrival(self, timestamp, lane_name, vehicle=0):
+        self.write(ARRIVAL, timestamp, self.topology.code[lane_name], 0, vehicle)
+
+    def move(self, timestamp, from_lane, to_lane, vehicle=0):
+        code = self.topology.code
+        self.write(MOVE, timestamp, code[from_lane], code[to_lane], vehicle)
+
+    def lights(self, timestamp, green_arms):
+        self.write(LIGHTS, timestamp, encode_lights(green_arms, self.topology))
+
+    def priority(self, timestamp, rule_name, active):
+        self.write(PRIORITY, timestamp, self.topology.rule_code[rule_name], 1 if active else 0)
+
+    def flush(self):
+        self.file.write(memoryview(self.buffer)[:self.used])
+        self.used = 0
+
+    def close(self):
+        if self.file.closed:
+            return
+        self.flush()
+        self.file.close()
+
+
+class TraceReader:
+    def __init__(self, path, topology=TOPOLOGY):
+        with open(path, "rb") as f:
+            self.mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, record_size, fingerprint = HEADER.unpack_from(self.mmap, 0)
+        if magic != MAGIC or record_size != RECORD.size:
+            self.mmap.close()
+            raise ValueError(f"{path} is not a traffic event trace")
+        if fingerprint and fingerprint != topology.fingerprint:
+            self.mmap.close()
+            raise ValueError(f"{path} was recorded with a different junction config")
+        self.topology = topology
+        self.count = (len(self.mmap) - HEADER_SIZE) // RECORD.size
+
+    def __len__(self):
+        return self.count
+
+    def record(self, index):
+        """(timestamp, kind, lane, to_lane, vehicle) of record index"""
+        return RECORD.unpack_from(self.mmap, HEADER_SIZE + index * RECORD.size)
+
+    def timestamp(self, index):
+        return TIMESTAMP.unpack_from(self.mmap, HEADER_SIZE + index * RECORD.size)[0]
+
+    def duration(self):
+        return self.timestamp(self.count - 1) if self.count else 0.0
+
+    def index_at(self, timestamp):
+        """Index of the first record later than timestamp"""
+        lo, hi = 0, self.count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self.timestamp(mid) <= timestamp:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def records(self, start=0, stop=None):
+        """Iterate over records start..stop-1 straight from the mapping"""
+        if stop is None or stop > self.count:
+            stop = self.count
+        if start >= stop:
+            return iter(())
+        view = memoryview(self.mmap)[HEADER_SIZE + start * RECORD.size:
+                                     HEADER_SIZE + stop * RECORD.size]
+        return RECORD.iter_unpack(view)
+
+    def close(self):
+        self.mmap.close()
+
+
+def describe(record, topology=TOPOLOGY):
+    timestamp, kind, lane, to_lane, vehicle = record
+    lanes = topology.lanes
+    if kind == ARRIVAL:
+        detail = f"{lanes[lane]} #{vehicle}"
+    elif kind == MOVE:
+        detail = f"{lanes[lane]} -> {lanes[to_lane]} #{vehicle}"
+    elif kind == LIGHTS:
+        detail = "green " + " ".join(decode_lights(lane, topology))
+    else:
+        detail = f"{topology.priority_rules[lane].name} {'on' if to_lane else 'off'}"
+    return f"{timestamp:10.2f}  {KIND_NAMES.get(kind, kind):8}  {detail}"
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Print records from an event trace")
+    parser.add_argument("path")
+    parser.add_argument("--start", type=float, default=0.0, help="first timestamp to show")
+    parser.add_argument("--end", type=float, default=None, help="last timestamp to show")
+    parser.add_argument("--topology", metavar="FILE", default=None,
+                        help="junction config the trace was recorded with")
+    args = parser.parse_args()
+
+    topology = TOPOLOGY
+    if args.topology:
+        from topology import load
+        topology = load(args.topology)
+    try:
+        reader = TraceReader(args.path, topology)
+    except ValueError as error:
+        parser.error(str(error))
+    first = reader.index_at(args.start - 1e-9)
+    last = reader.count if args.end is None else reader.index_at(args.end)
+    print(f"{reader.count} records, {reader.duration():.1f} s")
+    for record in reader.records(first, last):
+        print(describe(record, topology))
+    reader.close()
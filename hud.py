@@ -0,0 +1,162 @@
+"""Cached HUD for the simulator: lane stats panel, priority banner, controls.
+
+Fonts are loaded once. A lane's "W:/P:/p95" label is rasterized again
+only when its waiting or passed count, its wait p95 (to the second) or
+the AL2 priority marker changes, the mean queue line only when a signal
+group's time-weighted mean queue changes in the first decimal, and the
+stats panel is recomposited only when one of its labels did.
+Everything else is a single blit of a cached surface per frame.
+"""
+import pygame
+
+from occupancy import WINDOW
+from topology import TOPOLOGY
+
+
+WHITE = (255, 255, 255)
+BLACK = (0, 0, 0)
+RED = (255, 0, 0)
+YELLOW = (255, 255, 0)
+
+LANES_ORDER = list(TOPOLOGY.lanes)
+
+PANEL_POS = (10, 10)
+PANEL_SIZE = (240, 36 + 28 * (len(LANES_ORDER) + 3))
+
+
+class Hud:
+    def __init__(self, screen_width, screen_height):
+        self.screen_width = screen_width
+        self.screen_height = screen_height
+        self.fonts = {}
+        self.labels = {}
+        self.panel = None
+        self.panel_dirty = True
+        self.static = {}
+        self.profile = None
+        self.profile_rect = None
+
+    def font(self, size):
+        font = self.fonts.get(size)
+        if font is None:
+            font = self.fonts[size] = pygame.font.Font(None, size)
+        return font
+
+    def text(self, key, size, message, color):
+        """Rasterize a fixed piece of text once and keep it"""
+        surface = self.static.get(key)
+        if surface is None:
+            surface = self.static[key] = self.font(size).render(message, True, color)
+        return surface
+
+    def lane_label(self, lane_name, waiting, passed, p95, priority):
+        key = (waiting, passed, p95, priority)
+        cached = self.labels.get(lane_name)
+        if cached is not None and cached[0] == key:
+            return cached[1]
+
+        if priority:
+            color = YELLOW
+            lane_text = f"►{lane_name}"
+        else:
+            color = WHITE
+            lane_text = f" {lane_name}"
+        text = f"{lane_text}: W:{waiting} P:{passed}"
+        if passed:
+            text += f" p95:{p95}s"
+        label = self.font(20).render(text, True, color)
+        self.labels[lane_name] = (key, label)
+        self.panel_dirty = True
+        return label
+
+    def wait_label(self, wait_all):
+        key = tuple(round(w) for w in wait_all)
+        cached = self.labels.get("wait")
+        if cached is not None and cached[0] == key:
+            return cached[1]
+
+        label = self.font(20).render("Wait p50/95/99: %d/%d/%ds" % key, True, YELLOW)
+        self.labels["wait"] = (key, label)
+        self.panel_dirty = True
+        return label
+
+    def queue_label(self, name, title, queues):
+        key = tuple((group, round(mean, 1)) for group, mean in queues.items())
+        cached = self.labels.get(name)
+        if cached is not None and cached[0] == key:
+            return cached[1]
+
+        text = title + ": " + "  ".join(f"{group} {mean:.1f}" for group, mean in key)
+        label = self.font(20).render(text, True, YELLOW)
+        self.labels[name] = (key, label)
+        self.panel_dirty = True
+        return label
+
+    def build_panel(self, snapshot):
+        labels = [self.lane_label(name, snapshot.waiting[name], snapshot.passed[name],
+                                  round(snapshot.wait_p95[name]),
+                                  name in snapshot.priority_lanes)
+                  for name in LANES_ORDER]
+        labels.append(self.wait_label(snapshot.wait_all))
+        labels.append(self.queue_label("queue", "Mean queue", snapshot.mean_queue))
+        labels.append(self.queue_label("recent", f"{WINDOW / 60:g} min queue",
+                                       snapshot.recent_queue))
+        if not self.panel_dirty and self.panel is not None:
+            return self.panel
+
+        if self.panel is None:
+            self.panel = pygame.Surface(PANEL_SIZE)
+        self.panel.fill(BLACK)
+        self.panel.blit(self.text("header", 22, "Lane Stats", YELLOW), (8, 5))
+        y = 30
+        for label in labels:
+            self.panel.blit(label, (8, y))
+            y += 28
+        self.panel_dirty = False
+        return self.panel
+
+    def rects(self):
+        """Screen areas the HUD can change, for dirty-rect rendering"""
+        return [
+            pygame.Rect(PANEL_POS, PANEL_SIZE),
+            pygame.Rect(self.screen_width - 280, 10, 270, 50),
+            pygame.Rect(self.screen_width - 250, self.screen_height - 30, 250, 30),
+        ]
+
+    def draw(self, surface, snapshot):
+        """Draw simulation info"""
+        surface.blit(self.build_panel(snapshot), PANEL_POS)
+
+        if snapshot.priority_rules:
+            pygame.draw.rect(surface, RED, (self.screen_width - 280, 10, 270, 50))
+            banner = self.text(("priority", snapshot.priority_rules), 32,
+                               "⚠ " + ", ".join(snapshot.priority_rules) + " ACTIVE", YELLOW)
+            surface.blit(banner, (self.screen_width - 270, 22))
+
+        controls = self.text("controls", 22, "SPACE: Pause | ESC: Exit", WHITE)
+        surface.blit(controls, (self.screen_width - 250, self.screen_height - 30))
+
+    def set_profile_rows(self, rows):
+        """Render the profiler overlay, return the screen areas it touched"""
+        font = self.font(18)
+        columns = (0, 190, 245, 300)
+        width, height = 350, 16 * len(rows) + 10
+        self.profile = pygame.Surface((width, height))
+        self.profile.fill(BLACK)
+        for i, row in enumerate(rows):
+            color = YELLOW if i == 0 else WHITE
+            for x, text in zip(columns, row):
+                self.profile.blit(font.render(text, True, color), (5 + x, 5 + 16 * i))
+        old_rect = self.profile_rect
+        self.profile_rect = pygame.Rect(10, self.screen_height - height - 10, width, height)
+        return [r for r in (old_rect, self.profile_rect) if r is not None]
+
+    def draw_profile(self, surface):
+        if self.profile is not None:
+            surface.blit(self.profile, self.profile_rect)
+
+    def draw_paused(self, surface):
+        pause_text = self.text("paused", 96, "⏸ PAUSED", YELLOW)
+        text_rect = pause_text.get_rect(center=(self.screen_width // 2, self.screen_height // 2))
+        pygame.draw.rect(surface, BLACK, text_rect.inflate(40, 40))
+        surface.blit(pause_text, text_rect)
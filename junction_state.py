@@ -0,0 +1,230 @@
+"""Junction state shared by the simulator threads and the render loop.
+
+Concurrency model:
+
+* One re-entrant lock (``lock``) guards every field of JunctionState.
+  light_changer, generator and traversal only change lanes, lights,
+  stats and vehicles through the methods below, which take the lock.
+* ``changed`` is a Condition on that same lock. Every mutation notifies
+  it, so traversal can sleep on it until a light flips or a vehicle
+  arrives.
+* Readers never hold the lock while drawing. snapshot() returns an
+  immutable JunctionSnapshot that is rebuilt under the lock at most once
+  per mutation, so the 60 FPS render loop gets a consistent view (queue
+  order, counts and lights all from the same moment) and usually pays
+  nothing more than a version check. Between mutations only the queue
+  averages are brought forward, once per simulated second. Each lane also has its own version,
+  bumped only when a vehicle joins or leaves it, so a snapshot reuses the
+  queue tuples of untouched lanes and the renderer re-lays out only the
+  lanes that changed.
+"""
+import threading
+from collections import namedtuple
+
+from lane_queue import Queue
+from metrics import JunctionMetrics
+from phase_scheduler import PhaseScheduler
+from topology import TOPOLOGY
+
+
+LANES = list(TOPOLOGY.lanes)
+ARMS = list(TOPOLOGY.arms)
+
+
+JunctionSnapshot = namedtuple("JunctionSnapshot", [
+    "version",
+    "lights",      # {"A": "GREEN", ...}
+    "queues",      # {"AL1": (vehicle_id, ...), ...} front to back
+    "lane_versions",  # {"AL1": 7, ...} changes whenever that lane's queue does
+    "waiting",     # {"AL1": 3, ...}
+    "passed",      # {"AL1": 12, ...}
+    "vehicles",    # {vehicle_id: vehicle} for every vehicle on screen, int IDs
+    "priority_rules",  # ("AC_PRIORITY",) names of the active priority rules
+    "priority_lanes",  # frozenset({"AL2"}) lanes of the active priority rules
+    "wait_p95",    # {"AL1": 4.2, ...} seconds, 95th percentile wait so far
+    "wait_all",    # (p50, p95, p99) wait over every lane
+    "mean_queue",  # {"AC": 2.1, ...} time-weighted mean queue per signal group
+    "recent_queue",  # {"AC": 1.4, ...} queue per signal group over the last 5 minutes
+    "time",        # simulation time the queue averages were taken at
+])
+
+
+# Seconds of simulation time between refreshes of the queue averages in
+# an otherwise unchanged snapshot
+QUEUE_REFRESH = 1.0
+
+
+class JunctionState:
+    def __init__(self, priority_threshold=None):
+        self.lock = threading.RLock()
+        self.changed = threading.Condition(self.lock)
+
+        self.scheduler = PhaseScheduler(TOPOLOGY, priority_threshold)
+        self.green_phase = None
+        self.lane = {name: Queue() for name in LANES}
+        self.lane_stats = {name: {"passed": 0} for name in LANES}
+        self.lights = {arm: "RED" for arm in ARMS}
+        self.vehicles = {}
+        self.vehicle_id_counter = 0
+        self.last_move_time = {arm: 0 for arm in ARMS}
+        self.metrics = JunctionMetrics(LANES)
+
+        self.version = 0
+        self.lane_versions = {name: 0 for name in LANES}
+        self._lane_tuples = {}
+        self._snapshot = None
+
+    def _mutated(self):
+        """Call with the lock held after every change"""
+        self.version += 1
+        self.changed.notify_all()
+
+    # Writers
+
+    def set_lights(self, green_arms, phase=None, current_time=None):
+        """Switch lights to the arms in green_arms, a collection of arm names.
+
+        With current_time, also start timing phase (named after the green
+        arms if not given).
+        """
+        with self.lock:
+            for arm in ARMS:
+                self.lights[arm] = "GREEN" if arm in green_arms else "RED"
+            if current_time is not None:
+                self.metrics.phase_started(phase or "".join(green_arms), current_time)
+            self._mutated()
+
+    def add_vehicle(self, lane_name, make_vehicle, arrival_time=None):
+        """Enqueue a new vehicle built by make_vehicle(vehicle_id)"""
+        with self.lock:
+            vehicle_id = self.vehicle_id_counter
+            self.vehicle_id_counter += 1
+            vehicle = make_vehicle(vehicle_id)
+            vehicle.arrival_time = arrival_time
+            self.vehicles[vehicle_id] = vehicle
+            self.lane[lane_name].enqueue(vehicle_id)
+            self.scheduler.lane_changed(lane_name, 1, arrival_time)
+            self.lane_versions[lane_name] += 1
+            self._mutated()
+            return vehicle_id
+
+    def pop_vehicle(self, lane_name, current_time):
+        """Dequeue the front vehicle of a lane, return (vehicle_id, vehicle)"""
+        with self.lock:
+            vehicle_id = self.lane[lane_name].dequeue()
+            if vehicle_id is None:
+                return None, None
+            self.scheduler.lane_changed(lane_name, -1, current_time)
+            self.lane_stats[lane_name]["passed"] += 1
+            self.lane_versions[lane_name] += 1
+            self.last_move_time[TOPOLOGY.lane_arm[TOPOLOGY.code[lane_name]]] = current_time
+            vehicle = self.vehicles.get(vehicle_id)
+            if vehicle is not None:
+                vehicle.departure_time = current_time
+                if vehicle.arrival_time is not None:
+                    self.metrics.departure(lane_name, current_time - vehicle.arrival_time)
+            self._mutated()
+            return vehicle_id, vehicle
+
+    def reset(self, passed=None, start_time=None, metrics=None):
+        """Empty the junction, optionally with preset pass counts.
+
+        The queue averages restart at start_time, or at the next arrival
+        without it. metrics replaces the wait and phase metrics, which
+        otherwise start empty.
+        """
+        with self.lock:
+            for name in LANES:
+                self.lane[name] = Queue()
+                self.lane_versions[name] += 1
+                self.lane_stats[name]["passed"] = passed[name] if passed else 0
+            for arm in ARMS:
+                self.lights[arm] = "RED"
+            self.vehicles.clear()
+            self.scheduler.reset(start_time)
+            self.metrics = metrics if metrics is not None else JunctionMetrics(LANES)
+            self._mutated()
+
+    def start_phase(self, controller, current_time):
+        """Turn the next phase, as chosen by controller, green.
+
+        Returns (phase_name, green_time, priority_rule); phase_name is the
+        rule's name when a priority rule brought the phase forward.
+        """
+        with self.lock:
+            phase, rule = controller.next_phase(self.scheduler)
+            name = phase.name if rule is None else rule.name
+            green_time = controller.green_time(self.scheduler, phase, rule)
+            self.green_phase = phase
+            self.set_lights(TOPOLOGY.signal_groups[phase.group], name, current_time)
+            return name, green_time, rule
+
+    def extend_phase(self, controller, elapsed):
+        """Seconds controller holds the current green for, 0 to end it"""
+        with self.lock:
+            return controller.extend(self.scheduler, self.green_phase, elapsed)
+
+    def remove_vehicles(self, vehicle_ids):
+        """Forget vehicles that have left the screen"""
+        if not vehicle_ids:
+            return
+        with self.lock:
+            for vehicle_id in vehicle_ids:
+                self.vehicles.pop(vehicle_id, None)
+            self._mutated()
+
+    # Readers
+
+    def size(self, lane_name):
+        with self.lock:
+            return self.lane[lane_name].size()
+
+    def is_priority_active(self):
+        with self.lock:
+            return self.scheduler.priority_active()
+
+    def _lane_tuple(self, lane_name):
+        """Queue of lane_name as a tuple, rebuilt only if the lane changed"""
+        version = self.lane_versions[lane_name]
+        cached = self._lane_tuples.get(lane_name)
+        if cached is None or cached[0] != version:
+            cached = self._lane_tuples[lane_name] = (version, tuple(self.lane[lane_name]))
+        return cached[1]
+
+    def snapshot(self, now=None):
+        """Consistent, immutable view of the junction for the render loop.
+
+        now is the current simulation time, for the queue averages; it
+        defaults to the time of the last arrival or departure.
+        """
+        snapshot = self._snapshot
+        if snapshot is not None and snapshot.version == self.version and (
+                now is None or abs(now - snapshot.time) < QUEUE_REFRESH):
+            return snapshot
+        with self.lock:
+            if now is None:
+                now = self.scheduler.occupancy.now or 0.0
+            if self._snapshot is not None and self._snapshot.version == self.version:
+                self._snapshot = self._snapshot._replace(
+                    mean_queue=self.scheduler.queue_means(now),
+                    recent_queue=self.scheduler.recent_queues(now),
+                    time=now,
+                )
+            else:
+                self._snapshot = JunctionSnapshot(
+                    version=self.version,
+                    lights=dict(self.lights),
+                    queues={name: self._lane_tuple(name) for name in LANES},
+                    lane_versions=dict(self.lane_versions),
+                    waiting=dict(self.scheduler.occupancy.count),
+                    passed={name: s["passed"] for name, s in self.lane_stats.items()},
+                    vehicles=dict(self.vehicles),
+                    priority_rules=self.scheduler.priority_rules,
+                    priority_lanes=self.scheduler.priority_lanes,
+                    wait_p95={name: self.metrics.lane_quantile(name, 0.95) for name in LANES},
+                    wait_all=tuple(self.metrics.all_waits.quantiles([0.5, 0.95, 0.99])),
+                    mean_queue=self.scheduler.queue_means(now),
+                    recent_queue=self.scheduler.recent_queues(now),
+                    time=now,
+                )
+            return self._snapshot
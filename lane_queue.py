@@ -0,0 +1,65 @@
+"""Lane queue shared by the simulator, the generator and the engine.
+
+A growable ring buffer: enqueue, dequeue, size and indexed peek are all
+O(1), unlike list.pop(0) which shifts every queued vehicle.
+
+A Queue is not thread-safe on its own: enqueue and dequeue both update
+the element count. Threads share lanes only under the junction lock.
+"""
+
+
+class Queue:
+    def __init__(self, capacity=16):
+        size = 1
+        while size < capacity:
+            size *= 2
+        self.buffer = [None] * size
+        self.mask = size - 1
+        self.head = 0
+        self.count = 0
+
+    def enqueue(self, element):
+        if self.count == len(self.buffer):
+            self._grow()
+        self.buffer[(self.head + self.count) & self.mask] = element
+        self.count += 1
+
+    def dequeue(self):
+        if self.count == 0:
+            return None
+        element = self.buffer[self.head]
+        self.buffer[self.head] = None
+        self.head = (self.head + 1) & self.mask
+        self.count -= 1
+        return element
+
+    def peek(self, index=0):
+        """Return the vehicle index places from the front, or None"""
+        if 0 <= index < self.count:
+            return self.buffer[(self.head + index) & self.mask]
+        return None
+
+    def is_empty(self):
+        return self.count == 0
+
+    def size(self):
+        return self.count
+
+    def __len__(self):
+        return self.count
+
+    def __iter__(self):
+        """Iterate front to back without copying the queue"""
+        buffer, head, mask = self.buffer, self.head, self.mask
+        for i in range(self.count):
+            yield buffer[(head + i) & mask]
+
+    def get_all(self):
+        return list(self)
+
+    def _grow(self):
+        old = self.buffer
+        head = self.head
+        self.buffer = old[head:] + old[:head] + [None] * len(old)
+        self.mask = len(self.buffer) - 1
+        self.head = 0
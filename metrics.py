@@ -0,0 +1,131 @@
+"""Streaming wait-time and throughput metrics for the junction.
+
+Every departing vehicle adds its wait (departure time minus arrival
+time) to a histogram for its lane and to one for the whole junction.
+The histograms have fixed logarithmic buckets, so memory stays constant
+however long the run is, and p50/p95/p99 come out within a few percent
+of the exact value.
+
+Phases are counted as they start: how often each phase ran, how long it
+was green in total and at most, and how many vehicles crossed during it.
+This is what shows how long AL2 priority holds the other lanes.
+"""
+import math
+
+
+class WaitHistogram:
+    """Wait times in log-spaced buckets from resolution to max_wait seconds.
+
+    Bucket 0 holds waits below resolution; bucket i holds waits up to
+    resolution * growth ** i. Waits beyond max_wait share the last bucket.
+    """
+
+    def __init__(self, resolution=0.1, max_wait=3600.0, growth=1.05):
+        self.resolution = resolution
+        self.growth = growth
+        self.log_growth = math.log(growth)
+        self.buckets = [0] * (int(math.log(max_wait / resolution) / self.log_growth) + 2)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, wait):
+        if wait < self.resolution:
+            index = 0
+        else:
+            index = min(int(math.log(wait / self.resolution) / self.log_growth) + 1,
+                        len(self.buckets) - 1)
+        self.buckets[index] += 1
+        self.count += 1
+        self.total += wait
+        if wait > self.max:
+            self.max = wait
+
+    def mean(self):
+        return self.total / self.count if self.count else 0.0
+
+    def quantiles(self, qs):
+        """Upper bucket bounds for each quantile in qs (ascending), capped at max"""
+        results = []
+        if not self.count:
+            return [0.0] * len(qs)
+        seen = 0
+        q_index = 0
+        for index, n in enumerate(self.buckets):
+            seen += n
+            while q_index < len(qs) and seen >= qs[q_index] * self.count:
+                results.append(min(self.resolution * self.growth ** index, self.max))
+                q_index += 1
+            if q_index == len(qs):
+                break
+        return results
+
+    def quantile(self, q):
+        return self.quantiles([q])[0]
+
+    def summary(self):
+        p50, p95, p99 = self.quantiles([0.5, 0.95, 0.99])
+        return {
+            "count": self.count,
+            "mean": self.mean(),
+            "p50": p50,
+            "p95": p95,
+            "p99": p99,
+            "max": self.max,
+        }
+
+
+class JunctionMetrics:
+    def __init__(self, lanes):
+        self.waits = {name: WaitHistogram() for name in lanes}
+        self.all_waits = WaitHistogram()
+        self.phases = {}
+        self.phase = None
+        self.phase_start = 0.0
+
+    def departure(self, lane_name, wait):
+        """A vehicle left lane_name after waiting wait seconds"""
+        self.waits[lane_name].add(wait)
+        self.all_waits.add(wait)
+        if self.phase is not None:
+            self.phases[self.phase]["departures"] += 1
+
+    def phase_started(self, phase, now):
+        """Close the running phase at now and start counting phase"""
+        self.end_phase(now)
+        stats = self.phases.get(phase)
+        if stats is None:
+            stats = self.phases[phase] = {"count": 0, "green_time": 0.0,
+                                          "max_green": 0.0, "departures": 0}
+        stats["count"] += 1
+        self.phase = phase
+        self.phase_start = now
+
+    def end_phase(self, now):
+        if self.phase is None:
+            return
+        stats = self.phases[self.phase]
+        duration = now - self.phase_start
+        stats["green_time"] += duration
+        stats["max_green"] = max(stats["max_green"], duration)
+        self.phase = None
+
+    def lane_quantile(self, lane_name, q):
+        return self.waits[lane_name].quantile(q)
+
+    def summary(self, now=None):
+        """Wait statistics per lane (and "ALL") plus per-phase throughput.
+
+        With now, the phase that is still running counts up to now.
+        """
+        waits = {name: h.summary() for name, h in self.waits.items() if h.count}
+        waits["ALL"] = self.all_waits.summary()
+        phases = {}
+        for phase, stats in self.phases.items():
+            stats = dict(stats)
+            if phase == self.phase and now is not None:
+                stats["green_time"] += now - self.phase_start
+                stats["max_green"] = max(stats["max_green"], now - self.phase_start)
+            stats["per_phase"] = stats["departures"] / stats["count"]
+            phases[phase] = stats
+        return {"waits": waits, "phases": phases}
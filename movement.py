@@ -0,0 +1,138 @@
+"""Vectorized movement kernel for vehicles crossing the junction.
+
+All route paths from the PathTable are laid end to end in one read-only
+point array. Every moving vehicle owns one row of the batch: its
+position, the end of its route in that array and the index of the point
+it is heading for. step() advances all of them with a handful of NumPy
+operations instead of one Vehicle.update call per car, and keeps the
+arrival and removal rules of Vehicle.update.
+
+A vehicle's pos is replaced by a view onto its row while it is in the
+batch, so drawing code keeps reading vehicle.pos as before. prev_pos is
+a view onto the position before the last step, for interpolated drawing.
+"""
+import numpy as np
+
+
+class MovementBatch:
+    def __init__(self, path_table, capacity=64, speed=2.5, arrive_distance=3):
+        self.path_table = path_table
+        self.speed = speed
+        self.arrive_distance = arrive_distance
+
+        self.points = np.array(path_table.flat_points(), dtype=float).reshape(-1, 2)
+        self.points.flags.writeable = False
+
+        self.count = 0
+        self.vehicles = []
+        self.pos = np.zeros((0, 2))
+        self.prev_pos = np.zeros((0, 2))
+        self.path_start = np.zeros(0, dtype=np.int32)
+        self.path_end = np.zeros(0, dtype=np.int32)
+        self.path_index = np.zeros(0, dtype=np.int32)
+        self._resize(capacity)
+
+    def __len__(self):
+        return self.count
+
+    def _resize(self, capacity):
+        n = self.count
+        pos = np.zeros((capacity, 2))
+        prev_pos = np.zeros((capacity, 2))
+        path_start = np.zeros(capacity, dtype=np.int32)
+        path_end = np.zeros(capacity, dtype=np.int32)
+        path_index = np.zeros(capacity, dtype=np.int32)
+
+        pos[:n] = self.pos[:n]
+        prev_pos[:n] = self.prev_pos[:n]
+        path_start[:n] = self.path_start[:n]
+        path_end[:n] = self.path_end[:n]
+        path_index[:n] = self.path_index[:n]
+
+        self.pos, self.prev_pos = pos, prev_pos
+        self.path_start, self.path_end, self.path_index = path_start, path_end, path_index
+        for slot, vehicle in enumerate(self.vehicles):
+            vehicle.pos = self.pos[slot]
+            vehicle.prev_pos = self.prev_pos[slot]
+
+    def add(self, vehicle):
+        """Start moving vehicle along the path of vehicle.route"""
+        if self.count == len(self.pos):
+            self._resize(2 * len(self.pos))
+
+        start = self.path_table.offsets[vehicle.route]
+        slot = self.count
+        self.pos[slot] = vehicle.pos
+        self.prev_pos[slot] = vehicle.pos
+        self.path_start[slot] = start
+        self.path_end[slot] = start + len(self.path_table.paths[vehicle.route])
+        self.path_index[slot] = start
+        self.vehicles.append(vehicle)
+        self.count += 1
+
+        vehicle.pos = self.pos[slot]
+        vehicle.prev_pos = self.prev_pos[slot]
+        vehicle.batch_slot = slot
+
+    def remove(self, slot):
+        """Take the vehicle in slot out of the batch and return it"""
+        vehicle = self.vehicles[slot]
+        vehicle.pos = self.pos[slot].tolist()
+        vehicle.prev_pos = None
+        vehicle.path_index = int(self.path_index[slot] - self.path_start[slot])
+        vehicle.moving = False
+        vehicle.batch_slot = None
+
+        last = self.count - 1
+        if slot != last:
+            self.pos[slot] = self.pos[last]
+            self.prev_pos[slot] = self.prev_pos[last]
+            self.path_start[slot] = self.path_start[last]
+            self.path_end[slot] = self.path_end[last]
+            self.path_index[slot] = self.path_index[last]
+            moved = self.vehicles[last]
+            self.vehicles[slot] = moved
+            moved.pos = self.pos[slot]
+            moved.prev_pos = self.prev_pos[slot]
+            moved.batch_slot = slot
+        self.vehicles.pop()
+        self.count -= 1
+        return vehicle
+
+    def clear(self):
+        """Drop every vehicle, e.g. when a replay jumps to another time"""
+        self.vehicles = []
+        self.count = 0
+
+    def step(self):
+        """Advance every vehicle by one simulation step, return IDs of finished ones"""
+        n = self.count
+        if n == 0:
+            return []
+
+        pos = self.pos[:n]
+        self.prev_pos[:n] = pos
+        path_end = self.path_end[:n]
+        path_index = self.path_index[:n]
+
+        delta = self.points[path_index] - pos
+        dist = np.hypot(delta[:, 0], delta[:, 1])
+        reached = dist < self.arrive_distance
+
+        moving = ~reached
+        pos[moving] += delta[moving] / dist[moving, None] * self.speed
+
+        if not reached.any():
+            return []
+
+        path_index[reached] += 1
+
+        turning = np.flatnonzero(reached & (path_index < path_end - 1))
+        if len(turning):
+            d = self.points[path_index[turning] + 1] - self.points[path_index[turning]]
+            angles = (np.degrees(np.arctan2(-d[:, 1], d[:, 0])) - 90) % 360
+            for slot, angle in zip(turning.tolist(), angles.tolist()):
+                self.vehicles[slot].rotation = angle
+
+        finished = np.flatnonzero(reached & (path_index >= path_end))
+        return [self.remove(slot).vehicle_id for slot in finished[::-1].tolist()]
@@ -0,0 +1,184 @@
+"""Headless road network of four-arm junctions joined by timed links.
+
+Every junction is a JunctionSimulation from engine.py and all of them
+share one EventEngine, so a grid of hundreds of junctions is still one
+event heap on one virtual clock. A vehicle that crosses a junction and
+leaves by arm X either drives down the link on that arm and, after the
+link's travel time, joins the L2 or L3 lane of the neighbour's facing
+arm, or leaves the network if the arm is on the edge. Outside traffic
+arrives only on edge arms.
+
+Arms follow the single junction: A is north, B south, C east, D west.
+
+    python network.py --rows 1 --cols 6 --hours 2 --offset 8   # corridor
+    python network.py --rows 20 --cols 20 --hours 1            # 400 junctions
+"""
+import argparse
+import random
+import time
+
+from controllers import CONTROLLERS
+from engine import EventEngine, JunctionSimulation, ARMS
+from metrics import WaitHistogram
+
+
+# The arm of the neighbour a vehicle enters through, for each exit arm
+FACING_ARM = {"A": "B", "B": "A", "C": "D", "D": "C"}
+# Grid step (row, column) for each exit arm
+ARM_STEP = {"A": (-1, 0), "B": (1, 0), "C": (0, 1), "D": (0, -1)}
+
+TRAVEL_TIME = 30
+L3_SHARE = 0.5
+
+
+class NetworkJunction(JunctionSimulation):
+    """A junction that hands departing vehicles to its network"""
+
+    def __init__(self, network, index, **kwargs):
+        super().__init__(engine=network.engine, **kwargs)
+        self.network = network
+        self.index = index
+
+    def enqueue(self, lane_name, entered_at=None):
+        vehicle = super().enqueue(lane_name)
+        if entered_at is None:
+            # Arrived from outside the network
+            self.network.entered += 1
+        else:
+            self.vehicles.entered_at[vehicle] = entered_at
+        return vehicle
+
+    def on_move(self, vehicle, from_lane, to_lane):
+        topology = self.topology
+        self.network.leave(self.index, topology.lane_arm[topology.code[to_lane]],
+                           self.vehicles.entered_at[vehicle])
+
+
+class Network:
+    def __init__(self, seed=None, l3_share=L3_SHARE):
+        self.engine = EventEngine()
+        self.seed = seed
+        self.random = random.Random(seed)
+        self.l3_share = l3_share
+        self.junctions = []
+        self.links = {}
+        self.entered = 0
+        self.in_transit = 0
+        self.exited = 0
+        self.journeys = WaitHistogram(max_wait=6 * 3600)
+
+    def add_junction(self, phase_offset=0.0, **kwargs):
+        """Add a junction; kwargs go to JunctionSimulation. Returns its index"""
+        index = len(self.junctions)
+        # Every junction gets its own reproducible random streams.
+        seed = None if self.seed is None else self.seed * 1_000_000 + index
+        self.junctions.append(NetworkJunction(self, index, seed=seed,
+                                              phase_offset=phase_offset, **kwargs))
+        return index
+
+    def connect(self, a, arm_a, b, arm_b, travel_time=TRAVEL_TIME):
+        """Two-way road from arm_a of junction a to arm_b of junction b"""
+        self.links[(a, arm_a)] = (b, arm_b, travel_time)
+        self.links[(b, arm_b)] = (a, arm_a, travel_time)
+
+    def edge_arms(self, index):
+        return [arm for arm in ARMS if (index, arm) not in self.links]
+
+    def start(self, arrival_rate):
+        """Give every edge arm Poisson arrivals and start all junctions"""
+        from arrivals import PoissonArrivals
+        for junction in self.junctions:
+            junction.arrivals = {arm + sub: PoissonArrivals(arrival_rate)
+                                 for arm in self.edge_arms(junction.index)
+                                 for sub in ("L2", "L3")}
+            junction.start()
+
+    def run(self, duration):
+        self.engine.run(self.engine.now + duration)
+
+    def leave(self, index, arm, entered_at):
+        """A vehicle left junction index by arm"""
+        link = self.links.get((index, arm))
+        if link is None:
+            self.exited += 1
+            self.journeys.add(self.engine.now - entered_at)
+            return
+        neighbour, entry_arm, travel_time = link
+        self.in_transit += 1
+        self.engine.schedule(travel_time, self.enter, neighbour, entry_arm, entered_at)
+
+    def enter(self, index, arm, entered_at):
+        self.in_transit -= 1
+        sub_lane = "L3" if self.random.random() < self.l3_share else "L2"
+        self.junctions[index].enqueue(arm + sub_lane, entered_at)
+
+    def summary(self):
+        hours = self.engine.now / 3600
+        waits = [j.metrics.all_waits for j in self.junctions]
+        worst = max(range(len(waits)), key=lambda i: waits[i].quantile(0.95))
+        return {
+            "sim_time": self.engine.now,
+            "junctions": len(self.junctions),
+            "entered": self.entered,
+            "exited": self.exited,
+            "in_transit": self.in_transit,
+            "queued": sum(len(j.vehicles) for j in self.junctions),
+            "exits_per_hour": self.exited / hours if hours else 0.0,
+            "journey": self.journeys.summary(),
+            "worst_junction": worst,
+            "worst_junction_wait": waits[worst].summary(),
+        }
+
+
+def grid(rows, cols, seed=None, travel_time=TRAVEL_TIME, offset=0.0,
+         l3_share=L3_SHARE, **kwargs):
+    """rows x cols junctions; offset staggers each column's first phase"""
+    network = Network(seed=seed, l3_share=l3_share)
+    index = {}
+    for r in range(rows):
+        for c in range(cols):
+            index[r, c] = network.add_junction(phase_offset=offset * c, **kwargs)
+    for (r, c), a in index.items():
+        for arm in ("B", "C"):
+            dr, dc = ARM_STEP[arm]
+            b = index.get((r + dr, c + dc))
+            if b is not None:
+                network.connect(a, arm, b, FACING_ARM[arm], travel_time)
+    return network
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run a grid of junctions headlessly")
+    parser.add_argument("--rows", type=int, default=1)
+    parser.add_argument("--cols", type=int, default=4)
+    parser.add_argument("--hours", type=float, default=1.0)
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--arrival-rate", type=float, default=360,
+                        help="Poisson arrivals per hour on each edge lane")
+    parser.add_argument("--travel-time", type=float, default=TRAVEL_TIME,
+                        help="seconds to drive a link between neighbours")
+    parser.add_argument("--offset", type=float, default=0.0,
+                        help="first-phase delay per column, for a green wave")
+    parser.add_argument("--controller", choices=sorted(CONTROLLERS), default="fixed",
+                        help="signal controller of every junction (see controllers.py)")
+    args = parser.parse_args()
+
+    # Controllers keep no per-junction state, so the junctions share one
+    network = grid(args.rows, args.cols, seed=args.seed, travel_time=args.travel_time,
+                   offset=args.offset, controller=CONTROLLERS[args.controller]())
+    wall_start = time.perf_counter()
+    network.start(args.arrival_rate)
+    network.run(args.hours * 3600)
+    elapsed = time.perf_counter() - wall_start
+
+    result = network.summary()
+    journey = result["journey"]
+    worst = result["worst_junction_wait"]
+    print(f"Simulated {result['junctions']} junctions for {args.hours:g} h in {elapsed:.2f} s")
+    print(f"Entered: {result['entered']}  Exited: {result['exited']} "
+          f"({result['exits_per_hour']:.0f}/h)  In transit: {result['in_transit']}  "
+          f"Queued: {result['queued']}")
+    print(f"Journey time (s): p50 {journey['p50']:.0f}  p95 {journey['p95']:.0f}  "
+          f"p99 {journey['p99']:.0f}  max {journey['max']:.0f}")
+    print(f"Worst junction #{result['worst_junction']}: wait p95 {worst['p95']:.1f} s, "
+          f"p99 {worst['p99']:.1f} s")
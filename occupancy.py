@@ -0,0 +1,138 @@
+"""Lane occupancy kept up to date on every enqueue and dequeue.
+
+Occupancy counts the vehicles queued on each lane and on named groups of
+lanes (signal groups, phase demand lanes, priority rule lanes), so phase
+timing and the HUD read a total instead of summing lane sizes. Each lane
+and each group also carries two averages of its queue length:
+
+* the time-weighted mean since the start, from the area under the queue
+  length curve, and
+* a running average that decays exponentially over window seconds, for
+  the recent level of traffic.
+
+Both are brought up to date when the lane or group changes, so reading
+either is O(1). Groups added with averages=False only keep the total,
+which costs a single addition per change.
+
+Time never runs backwards: a change timed before the last one (or before
+the start given to reset) counts as happening at that time.
+"""
+import math
+
+
+WINDOW = 300.0
+
+
+class Occupancy:
+    def __init__(self, lanes, window=WINDOW):
+        self.lanes = tuple(lanes)
+        self.window = window
+        self.group_lanes = {}
+        self.groups_of = {name: [] for name in self.lanes}
+        self.averaged_groups_of = {name: [] for name in self.lanes}
+        self.averaged_groups = []
+        self.reset()
+
+    def reset(self, start_time=None):
+        """Empty every lane and restart the averages at start_time.
+
+        Without start_time the averages start at the next change.
+        """
+        self.count = {name: 0 for name in self.lanes}
+        self.area = {name: 0.0 for name in self.lanes}
+        self.average = {name: 0.0 for name in self.lanes}
+        self.last = {name: start_time for name in self.lanes}
+        self.group_count = {key: 0 for key in self.group_lanes}
+        self.group_area = {key: 0.0 for key in self.averaged_groups}
+        self.group_average = {key: 0.0 for key in self.averaged_groups}
+        self.group_last = {key: start_time for key in self.averaged_groups}
+        self.start = start_time
+        self.now = start_time
+
+    def add_group(self, key, lanes, averages=True):
+        """Keep a total for lanes under key; any hashable key will do.
+
+        With averages, group_mean and group_running_average work for key
+        too. Add groups before the first change.
+        """
+        lanes = tuple(lanes)
+        self.group_lanes[key] = lanes
+        self.group_count[key] = sum(self.count[name] for name in lanes)
+        for name in lanes:
+            self.groups_of[name].append(key)
+        if averages:
+            self.averaged_groups.append(key)
+            self.group_area[key] = 0.0
+            self.group_average[key] = 0.0
+            self.group_last[key] = self.now
+            for name in lanes:
+                self.averaged_groups_of[name].append(key)
+
+    def changed(self, lane_name, delta, now=None):
+        """delta vehicles joined (+) or left (-) lane_name at time now.
+
+        now defaults to the time of the last change.
+        """
+        if self.now is None:
+            if now is None:
+                now = 0.0
+            self.start = now
+        elif now is None or now < self.now:
+            now = self.now
+        self.now = now
+        window = self.window
+        count = self.count[lane_name]
+        since = self.last[lane_name]
+        if since is not None and now > since:
+            elapsed = now - since
+            self.area[lane_name] += count * elapsed
+            self.average[lane_name] += (count - self.average[lane_name]) * (
+                1.0 - math.exp(-elapsed / window))
+        self.last[lane_name] = now
+        self.count[lane_name] = count + delta
+        group_count, group_area = self.group_count, self.group_area
+        group_average, group_last = self.group_average, self.group_last
+        for key in self.averaged_groups_of[lane_name]:
+            count = group_count[key]
+            since = group_last[key]
+            if since is not None and now > since:
+                elapsed = now - since
+                group_area[key] += count * elapsed
+                group_average[key] += (count - group_average[key]) * (
+                    1.0 - math.exp(-elapsed / window))
+            group_last[key] = now
+        for key in self.groups_of[lane_name]:
+            group_count[key] += delta
+
+    def _mean(self, count, area, last, key, now):
+        if self.start is None:
+            return 0.0
+        elapsed = now - self.start
+        if elapsed <= 0:
+            return float(count[key])
+        total = area[key]
+        if last[key] is not None:
+            total += count[key] * max(0.0, now - last[key])
+        return total / elapsed
+
+    def _running_average(self, count, average, last, key, now):
+        since = last[key]
+        if since is None or now <= since:
+            return average[key]
+        return average[key] + (count[key] - average[key]) * (
+            1.0 - math.exp(-(now - since) / self.window))
+
+    def mean(self, lane_name, now):
+        """Time-weighted mean queue length of lane_name up to now"""
+        return self._mean(self.count, self.area, self.last, lane_name, now)
+
+    def running_average(self, lane_name, now):
+        """Queue length of lane_name averaged over about the last window seconds"""
+        return self._running_average(self.count, self.average, self.last, lane_name, now)
+
+    def group_mean(self, key, now):
+        return self._mean(self.group_count, self.group_area, self.group_last, key, now)
+
+    def group_running_average(self, key, now):
+        return self._running_average(self.group_count, self.group_average,
+                                     self.group_last, key, now)
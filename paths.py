@@ -0,0 +1,40 @@
+"""Precomputed crossing paths for every (from_lane, to_lane) route.
+
+Paths depend only on the route and the screen size, so they are built
+once at startup from the topology's path specs into a shared, immutable
+table. Vehicles keep a route index and a reference to the table's tuple
+instead of their own list.
+"""
+from topology import TOPOLOGY
+
+
+class PathTable:
+    """Every route's path, built once for a given screen size.
+
+    paths[route] is a tuple of (x, y) points. offsets[route] is where that
+    path starts when all paths are laid end to end, which is the layout
+    the movement kernel uses for its flat point array.
+    """
+
+    def __init__(self, screen_width, screen_height, topology=TOPOLOGY):
+        center_x, center_y = screen_width // 2, screen_height // 2
+        self.route_index = {}
+        paths = []
+        offsets = []
+        offset = 0
+        for route, (from_lane, to_lane) in enumerate(topology.routes):
+            path = tuple(topology.build_path(route, center_x, center_y))
+            self.route_index[(from_lane, to_lane)] = route
+            paths.append(path)
+            offsets.append(offset)
+            offset += len(path)
+        self.paths = tuple(paths)
+        self.offsets = tuple(offsets)
+        self.total_points = offset
+
+    def route(self, from_lane, to_lane):
+        return self.route_index[(from_lane, to_lane)]
+
+    def flat_points(self):
+        """All paths laid end to end as a list of (x, y) points"""
+        return [point for path in self.paths for point in path]
@@ -0,0 +1,211 @@
+"""Signal phase scheduler built on an indexed priority queue.
+
+The phases of the topology's phase plan wait in an IndexedPriorityQueue
+keyed by (class, turn). turn is the phase's place in the cycle: a phase
+that has just been served goes to the back. class is 0 while one of the
+phase's priority rules is active and 1 otherwise, so an active rule
+brings its phase forward past every normal phase.
+
+Vehicles joining and leaving lanes are reported to lane_changed, which
+keeps an Occupancy with totals for every signal group, phase demand set
+and rule. A rule that switches on or off re-keys its phase with
+decrease_key or increase_key, O(log phases), instead of the whole plan
+being rebuilt and re-sorted each cycle, and green times are sized from
+the running totals instead of summing lane sizes. The phase that is green is
+not in the queue while it runs, so no phase is ever served twice in a
+row and a two-phase plan always alternates.
+"""
+from occupancy import Occupancy
+from priority_queue import IndexedPriorityQueue
+
+
+class Rule:
+    """A priority rule of the topology with its live vehicle count"""
+
+    def __init__(self, spec, threshold=None, deactivate=None):
+        self.name = spec.name
+        self.phase = spec.phase
+        self.lanes = spec.lanes
+        self.threshold = spec.threshold if threshold is None else threshold
+        self.deactivate = spec.deactivate if deactivate is None else deactivate
+        self.count = 0
+        self.active = False
+
+    def update(self, count):
+        """Take the new count; return True if the rule switched on or off"""
+        self.count = count
+        if self.active:
+            if self.count >= self.threshold:
+                return False
+            if self.deactivate is not None and self.count > self.deactivate:
+                return False
+            self.active = False
+            return True
+        if self.count >= self.threshold:
+            self.active = True
+            return True
+        return False
+
+
+class PhaseScheduler:
+    def __init__(self, topology, priority_threshold=None, priority_deactivate_threshold=None,
+                 start_time=None):
+        """
+        priority_threshold and priority_deactivate_threshold, when given,
+        replace the thresholds of every priority rule in the topology.
+        start_time is where the queue averages start (see reset).
+        """
+        self.phases = {phase.name: phase for phase in topology.phases}
+        self.order = [phase.name for phase in topology.phases]
+        self.rules = [Rule(spec, priority_threshold, priority_deactivate_threshold)
+                      for spec in topology.priority_rules]
+        self.rules_by_lane = {}
+        self.rules_by_phase = {}
+        for rule in self.rules:
+            for lane in rule.lanes:
+                self.rules_by_lane.setdefault(lane, []).append(rule)
+            self.rules_by_phase.setdefault(rule.phase, []).append(rule)
+
+        # Totals for ("signal", group), ("demand", phase) and ("rule", rule)
+        self.occupancy = Occupancy(topology.lanes)
+        self.signal_groups = {}
+        for group, arms in topology.signal_groups.items():
+            key = ("signal", group)
+            self.signal_groups[group] = key
+            self.occupancy.add_group(key, [lane for lane in topology.incoming
+                                           if topology.lane_arm[topology.code[lane]] in arms])
+        for phase in topology.phases:
+            self.occupancy.add_group(("demand", phase.name), phase.demand, averages=False)
+        for rule in self.rules:
+            self.occupancy.add_group(("rule", rule.name), rule.lanes, averages=False)
+        self.reset(start_time)
+
+    def reset(self, start_time=None):
+        """Empty every rule and restart the cycle from the first phase.
+
+        The queue averages restart at start_time, or at the next change
+        without it.
+        """
+        for rule in self.rules:
+            rule.count = 0
+            rule.active = False
+        self.active_rules = 0
+        self.occupancy.reset(start_time)
+        self.held = {name: () for name in self.phases}
+        # Lanes and names of the active rules, for the HUD
+        self.priority_lanes = frozenset()
+        self.priority_rules = ()
+        self.queue = IndexedPriorityQueue()
+        self.turns = {}
+        self.turn = 0
+        self.current = None
+        for name in self.order:
+            self._push(name)
+
+    def _priority_class(self, name):
+        for rule in self.rules_by_phase.get(name, ()):
+            if rule.active:
+                return 0
+        return 1
+
+    def _push(self, name):
+        self.turns[name] = self.turn
+        self.turn += 1
+        self.queue.push(name, (self._priority_class(name), self.turns[name]))
+
+    def lane_changed(self, lane_name, delta, now=None):
+        """A vehicle joined (+1) or left (-1) lane_name.
+
+        Returns the rules that switched on or off, empty if none did.
+        """
+        occupancy = self.occupancy
+        occupancy.changed(lane_name, delta, now)
+        rules = self.rules_by_lane.get(lane_name)
+        if rules is None:
+            return ()
+        switched = []
+        for rule in rules:
+            if not rule.update(occupancy.group_count["rule", rule.name]):
+                continue
+            switched.append(rule)
+            self.active_rules += 1 if rule.active else -1
+            name = rule.phase
+            if name in self.queue:
+                key = (self._priority_class(name), self.turns[name])
+                if key < self.queue.key(name):
+                    self.queue.decrease_key(name, key)
+                elif key > self.queue.key(name):
+                    self.queue.increase_key(name, key)
+        if switched:
+            self._update_held()
+        return switched
+
+    def _update_held(self):
+        """Demand lanes of each phase that active rules hold for their own phase"""
+        held = {lane for rule in self.rules if rule.active for lane in rule.lanes}
+        self.held = {name: tuple(lane for lane in phase.demand if lane in held)
+                     for name, phase in self.phases.items()}
+        self.priority_lanes = frozenset(held)
+        self.priority_rules = tuple(rule.name for rule in self.rules if rule.active)
+
+    def priority_active(self):
+        return self.active_rules > 0
+
+    def active_rule(self, name):
+        """The first active priority rule of phase name, or None"""
+        for rule in self.rules_by_phase.get(name, ()):
+            if rule.active:
+                return rule
+        return None
+
+    def next_phase(self):
+        """End the current phase and start the next in the queue.
+
+        Returns (phase, rule): the topology Phase and the active priority
+        rule it runs under, or None for a normal phase.
+        """
+        if self.queue.is_empty():
+            # A one-phase plan just repeats
+            return self.select(self.current)
+        return self.select(self.queue.peek())
+
+    def select(self, name):
+        """End the current phase and start phase name, wherever it is queued"""
+        if name != self.current:
+            self.queue.remove(name)
+            if self.current is not None:
+                self._push(self.current)
+            self.current = name
+        return self.phases[name], self.active_rule(name)
+
+    def waiting(self, name):
+        """Vehicles queued on the lanes phase name turns green, O(1)"""
+        return self.occupancy.group_count["signal", self.phases[name].group]
+
+    def vehicles_to_serve(self, phase, rule):
+        """Vehicles the phase's green time is sized for.
+
+        Under a priority rule that is every vehicle on the rule's lanes;
+        otherwise the average queue over the demand lanes that no active
+        rule is holding for its own phase. Both come from running totals.
+        """
+        if rule is not None:
+            return rule.count
+        held = self.held[phase.name]
+        lanes = len(phase.demand) - len(held)
+        if lanes <= 0:
+            return 0
+        total = self.occupancy.group_count["demand", phase.name]
+        for lane in held:
+            total -= self.occupancy.count[lane]
+        return max(1, int(total / lanes))
+
+    def queue_means(self, now):
+        """Time-weighted mean queue of each signal group up to now"""
+        return {group: self.occupancy.group_mean(key, now)
+                for group, key in self.signal_groups.items()}
+
+    def recent_queues(self, now):
+        """Queue of each signal group averaged over the last occupancy window"""
+        return {group: self.occupancy.group_running_average(key, now)
+                for group, key in self.signal_groups.items()}
@@ -0,0 +1,113 @@
+"""Indexed binary min-heap: a priority queue whose entries can be re-keyed.
+
+Besides push and pop, every queued item's position in the heap is kept
+in an index, so the key of an item already in the queue can be lowered
+(decrease_key), raised (increase_key) or the item removed in O(log n)
+without searching the heap or pushing a stale duplicate. Items must be
+hashable and unique; keys are anything comparable, e.g. (class, turn).
+"""
+
+
+class IndexedPriorityQueue:
+    def __init__(self):
+        self.heap = []        # [key, item] pairs
+        self.position = {}    # item -> index in heap
+
+    def __len__(self):
+        return len(self.heap)
+
+    def __contains__(self, item):
+        return item in self.position
+
+    def is_empty(self):
+        return not self.heap
+
+    def key(self, item):
+        return self.heap[self.position[item]][0]
+
+    def push(self, item, key):
+        if item in self.position:
+            raise KeyError(f"{item!r} is already queued")
+        self.heap.append([key, item])
+        self.position[item] = len(self.heap) - 1
+        self._sift_up(len(self.heap) - 1)
+
+    def peek(self):
+        """Item with the smallest key, or None"""
+        return self.heap[0][1] if self.heap else None
+
+    def pop(self):
+        """Remove and return the item with the smallest key, or None"""
+        if not self.heap:
+            return None
+        return self._remove_at(0)
+
+    def remove(self, item):
+        self._remove_at(self.position[item])
+
+    def decrease_key(self, item, key):
+        index = self.position[item]
+        if key > self.heap[index][0]:
+            raise ValueError(f"new key {key!r} is larger than the current one")
+        self.heap[index][0] = key
+        self._sift_up(index)
+
+    def increase_key(self, item, key):
+        index = self.position[item]
+        if key < self.heap[index][0]:
+            raise ValueError(f"new key {key!r} is smaller than the current one")
+        self.heap[index][0] = key
+        self._sift_down(index)
+
+    def update(self, item, key):
+        """Set item's key, pushing it if it is not queued"""
+        index = self.position.get(item)
+        if index is None:
+            self.push(item, key)
+        elif key < self.heap[index][0]:
+            self.decrease_key(item, key)
+        else:
+            self.increase_key(item, key)
+
+    def _remove_at(self, index):
+        heap = self.heap
+        item = heap[index][1]
+        del self.position[item]
+        last = heap.pop()
+        if index < len(heap):
+            heap[index] = last
+            self.position[last[1]] = index
+            self._sift_down(index)
+            self._sift_up(index)
+        return item
+
+    def _sift_up(self, index):
+        heap, position = self.heap, self.position
+        entry = heap[index]
+        while index > 0:
+            parent = (index - 1) >> 1
+            if not entry[0] < heap[parent][0]:
+                break
+            heap[index] = heap[parent]
+            position[heap[index][1]] = index
+            index = parent
+        heap[index] = entry
+        position[entry[1]] = index
+
+    def _sift_down(self, index):
+        heap, position = self.heap, self.position
+        size = len(heap)
+        entry = heap[index]
+        while True:
+            child = 2 * index + 1
+            if child >= size:
+                break
+            if child + 1 < size and heap[child + 1][0] < heap[child][0]:
+                child += 1
+            if not heap[child][0] < entry[0]:
+                break
+            heap[index] = heap[child]
+            position[heap[index][1]] = index
+            index = child
+        heap[index] = entry
+        position[entry[1]] = index
@@ -0,0 +1,134 @@
+"""Frame-stage timers and thread wake-up counters for simulator.py.
+
+Each stage of the main loop is wrapped in profiler.section(name). While
+the profiler is enabled, every section keeps its durations for the last
+`window` frames in a RollingTimer, so the overlay and the exports show
+what the frame costs now, not averaged over the whole run. Threads
+count their wake-ups with profiler.count(name). Sections are meant for
+the render loop only; counters may be bumped from any thread.
+
+When the profiler is disabled, section() hands back one shared no-op
+context manager and count() returns at once, so the instrumentation can
+stay in the hot path.
+"""
+import csv
+import json
+import threading
+import time
+from collections import deque
+
+
+class RollingTimer:
+    def __init__(self, window=120):
+        self.samples = deque(maxlen=window)
+        self.total_calls = 0
+
+    def add(self, seconds):
+        self.samples.append(seconds)
+        self.total_calls += 1
+
+    def summary(self):
+        """Milliseconds over the window: last, mean, p95 and max"""
+        if not self.samples:
+            return {"last_ms": 0.0, "mean_ms": 0.0, "p95_ms": 0.0, "max_ms": 0.0, "calls": 0}
+        ordered = sorted(self.samples)
+        return {
+            "last_ms": self.samples[-1] * 1000,
+            "mean_ms": sum(ordered) / len(ordered) * 1000,
+            "p95_ms": ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))] * 1000,
+            "max_ms": ordered[-1] * 1000,
+            "calls": self.total_calls,
+        }
+
+
+class _Section:
+    def __init__(self, timer):
+        self.timer = timer
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+
+    def __exit__(self, *exc):
+        self.timer.add(time.perf_counter() - self.start)
+
+
+class _NullSection:
+    def __enter__(self):
+        pass
+
+    def __exit__(self, *exc):
+        pass
+
+
+NULL_SECTION = _NullSection()
+
+
+class Profiler:
+    def __init__(self, enabled=False, window=120):
+        self.enabled = enabled
+        self.window = window
+        self.timers = {}
+        self.sections = {}
+        self.counters = {}
+        self.counter_lock = threading.Lock()
+
+    def section(self, name):
+        """Context manager that times one stage of the frame"""
+        if not self.enabled:
+            return NULL_SECTION
+        section = self.sections.get(name)
+        if section is None:
+            timer = self.timers[name] = RollingTimer(self.window)
+            section = self.sections[name] = _Section(timer)
+        return section
+
+    def record(self, name, seconds):
+        """Add one sample timed by the caller, e.g. summed over several calls"""
+        if not self.enabled:
+            return
+        timer = self.timers.get(name)
+        if timer is None:
+            timer = self.timers[name] = RollingTimer(self.window)
+            self.sections[name] = _Section(timer)
+        timer.add(seconds)
+
+    def count(self, name, n=1):
+        """Add n to a counter; safe to call from any thread"""
+        if not self.enabled:
+            return
+        with self.counter_lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def summary(self):
+        return {
+            "timers": {name: timer.summary() for name, timer in self.timers.items()},
+            "counters": dict(self.counters),
+        }
+
+    def rows(self):
+        """(name, mean, p95, max) text columns for the overlay"""
+        rows = [("stage (ms)", "mean", "p95", "max")]
+        for name, s in self.summary()["timers"].items():
+            rows.append((name, f"{s['mean_ms']:.2f}", f"{s['p95_ms']:.2f}", f"{s['max_ms']:.2f}"))
+        for name, n in sorted(self.counters.items()):
+            rows.append((name, str(n), "", ""))
+        return rows
+
+    def export(self, path):
+        """Write the summary as JSON if path ends in .json, else as CSV"""
+        summary = self.summary()
+        if path.endswith(".json"):
+            with open(path, "w") as f:
+                json.dump(summary, f, indent=2)
+            return
+        with open(path, "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(["name", "calls", "last_ms", "mean_ms", "p95_ms", "max_ms"])
+            for name, s in summary["timers"].items():
+                writer.writerow([name, s["calls"], round(s["last_ms"], 4), round(s["mean_ms"], 4),
+                                 round(s["p95_ms"], 4), round(s["max_ms"], 4)])
+            for name, n in summary["counters"].items():
+                writer.writerow([name, n, "", "", "", ""])
+
+
+profiler = Profiler()
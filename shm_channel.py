@@ -0,0 +1,162 @@
+"""Shared-memory event channel from traffic_generator.py to the visualizer.
+
+A single-producer, single-consumer ring buffer over
+multiprocessing.shared_memory. The generator process writes fixed-size
+binary records and the pygame process reads them, so the two run on
+separate cores with no files, pipes or pickling in between.
+
+Layout (little endian):
+
+    offset   0  write index  u64   only the producer stores it
+    offset  64  read index   u64   only the consumer stores it
+    offset 128  magic b"TJC1", capacity u32, record size u32, topology u32
+    offset 192  capacity records of RECORD
+
+    RECORD: timestamp f64, kind u8, lane u8, to_lane u8, pad, vehicle u32
+
+Lanes travel as their code in the topology and lights as a bitmask over
+its arms. Both ends must use the same junction config: the producer
+writes the topology's fingerprint into the header and attach() checks
+it.
+
+Indices only ever grow; a record lives in slot index % capacity. The
+producer fills a slot before it publishes the new write index, and the
+consumer copies records out before it publishes the new read index, so
+neither side needs a cross-process lock. The indices sit on separate
+cache lines. Within the producer process several threads may send, so
+send() serializes them with an ordinary threading.Lock.
+"""
+import struct
+import threading
+from multiprocessing import shared_memory
+
+from topology import TOPOLOGY
+
+
+ARRIVAL = 1   # lane: lane the vehicle joined
+MOVE = 2      # lane -> to_lane: vehicle crossed the junction
+LIGHTS = 3    # lane: bitmask of arms that are green
+
+RECORD = struct.Struct("<dBBBxI")
+INDEX = struct.Struct("<Q")
+META = struct.Struct("<4sIII")
+MAGIC = b"TJC1"
+WRITE_OFFSET = 0
+READ_OFFSET = 64
+META_OFFSET = 128
+HEADER_SIZE = 192
+
+DEFAULT_NAME = "traffic_junction"
+
+
+def check_topology(topology):
+    """Raise ValueError if topology's codes do not fit in a RECORD"""
+    if len(topology.lanes) > 256 or len(topology.priority_rules) > 256:
+        raise ValueError("a topology with more than 256 lanes or rules cannot be encoded")
+    if len(topology.arms) > 8:
+        raise ValueError("a topology with more than 8 arms cannot be encoded")
+
+
+def encode_lights(green_arms, topology=TOPOLOGY):
+    return sum(1 << topology.arms.index(arm) for arm in green_arms)
+
+
+def decode_lights(mask, topology=TOPOLOGY):
+    """Tuple of the green arms in mask"""
+    return tuple(arm for i, arm in enumerate(topology.arms) if mask & 1 << i)
+
+
+class EventChannel:
+    def __init__(self, shm, owner, topology):
+        self.shm = shm
+        self.owner = owner
+        self.topology = topology
+        self.buf = shm.buf
+        magic, self.capacity, record_size, fingerprint = META.unpack_from(self.buf, META_OFFSET)
+        if magic != MAGIC or record_size != RECORD.size:
+            shm.close()
+            raise ValueError(f"{shm.name} is not a traffic event channel")
+        if fingerprint != topology.fingerprint:
+            shm.close()
+            raise ValueError(f"{shm.name} was created for a different junction config")
+        self.send_lock = threading.Lock()
+        self.write_index = INDEX.unpack_from(self.buf, WRITE_OFFSET)[0]
+        self.read_index = INDEX.unpack_from(self.buf, READ_OFFSET)[0]
+
+    @classmethod
+    def create(cls, name=DEFAULT_NAME, capacity=65536, topology=TOPOLOGY):
+        """Create the channel; done by the producer, which also unlinks it"""
+        check_topology(topology)
+        size = HEADER_SIZE + capacity * RECORD.size
+        try:
+            shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+        except FileExistsError:
+            # Left behind by a producer that died before unlinking it
+            stale = shared_memory.SharedMemory(name=name)
+            stale.close()
+            stale.unlink()
+            shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+        INDEX.pack_into(shm.buf, WRITE_OFFSET, 0)
+        INDEX.pack_into(shm.buf, READ_OFFSET, 0)
+        META.pack_into(shm.buf, META_OFFSET, MAGIC, capacity, RECORD.size, topology.fingerprint)
+        return cls(shm, True, topology)
+
+    @classmethod
+    def attach(cls, name=DEFAULT_NAME, topology=TOPOLOGY):
+        """Attach to an existing channel as the consumer"""
+        try:
+            shm = shared_memory.SharedMemory(name=name, track=False)
+        except TypeError:
+            # Before Python 3.13 attaching also registers the segment with
+            # the resource tracker, which would unlink it when we exit.
+            from multiprocessing import resource_tracker
+            shm = shared_memory.SharedMemory(name=name)
+            # The tracker knows the segment by its POSIX name, which has
+            # the leading slash that SharedMemory.name strips.
+            resource_tracker.unregister("/" + shm.name.lstrip("/"), "shared_memory")
+        return cls(shm, False, topology)
+
+    # Producer side
+
+    def send(self, kind, timestamp, lane=0, to_lane=0, vehicle=0):
+        """Append one record; returns False if the consumer is a full ring behind"""
+        with self.send_lock:
+            read_index = INDEX.unpack_from(self.buf, READ_OFFSET)[0]
+            if self.write_index - read_index >= self.capacity:
+                return False
+            offset = HEADER_SIZE + (self.write_index % self.capacity) * RECORD.size
+            RECORD.pack_into(self.buf, offset, timestamp, kind, lane, to_lane, vehicle)
+            self.write_index += 1
+            INDEX.pack_into(self.buf, WRITE_OFFSET, self.write_index)
+            return True
+
+    def send_arrival(self, timestamp, lane_name, vehicle=0):
+        return self.send(ARRIVAL, timestamp, self.topology.code[lane_name], 0, vehicle)
+
+    def send_move(self, timestamp, from_lane, to_lane, vehicle=0):
+        code = self.topology.code
+        return self.send(MOVE, timestamp, code[from_lane], code[to_lane], vehicle)
+
+    def send_lights(self, timestamp, green_arms):
+        return self.send(LIGHTS, timestamp, encode_lights(green_arms, self.topology))
+
+    # Consumer side
+
+    def receive(self, max_records=4096):
+        """Return up to max_records (timestamp, kind, lane, to_lane, vehicle) tuples"""
+        write_index = INDEX.unpack_from(self.buf, WRITE_OFFSET)[0]
+        count = min(write_index - self.read_index, max_records)
+        records = []
+        for i in range(self.read_index, self.read_index + count):
+            offset = HEADER_SIZE + (i % self.capacity) * RECORD.size
+            records.append(RECORD.unpack_from(self.buf, offset))
+        if count:
+            self.read_index += count
+            INDEX.pack_into(self.buf, READ_OFFSET, self.read_index)
+        return records
+
+    def close(self):
+        self.buf = None
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
@@ -0,0 +1,33 @@
+"""Scaled simulation clock for the simulator threads.
+
+Simulation time runs time_scale times faster than the wall clock. The
+light changer, generator and traversal threads sleep and wait through
+this clock, and the render loop feeds the same scale into its fixed
+timestep accumulator, so vehicles and lights stay in step at 1x or 100x.
+"""
+import time
+
+
+class SimClock:
+    def __init__(self, time_scale=1.0):
+        self.time_scale = time_scale
+        self.base_wall = time.monotonic()
+        self.base_sim = 0.0
+
+    def time(self):
+        """Seconds of simulation time since the clock was created"""
+        return self.base_sim + (time.monotonic() - self.base_wall) * self.time_scale
+
+    def set_time_scale(self, time_scale):
+        self.base_sim = self.time()
+        self.base_wall = time.monotonic()
+        self.time_scale = time_scale
+
+    def sleep(self, seconds):
+        time.sleep(seconds / self.time_scale)
+
+    def wait(self, condition, timeout=None):
+        """condition.wait with a timeout given in simulation seconds"""
+        if timeout is None:
+            return condition.wait()
+        return condition.wait(timeout / self.time_scale)
@@ -1,16 +1,38 @@
-import pygame
+"""Traffic junction visualizer.
+
+Importing this module is cheap and has no side effects: the junction
+state, the control threads and the vehicle model are set up, but pygame,
+the display, fonts and images are only loaded by init_display() when a
+renderer is actually started, and NumPy only by init_simulation().
+
+    python simulator.py [--speed 10] [--fps 30] [--no-render] [--dirty-rects] [--profile]
+    python simulator.py --replay day.trace [--seek 28800]
+"""
+import copy
 import time
 import threading
 from collections import deque
-import heapq
 import math
-pygame.init()
+import random
+from controllers import CONTROLLERS, FixedTimeController
+from junction_state import JunctionState
+from metrics import JunctionMetrics
+from paths import PathTable
+from profiler import profiler
+from sim_clock import SimClock
+from topology import TOPOLOGY
+
+# Imported by init_display(), so headless runs never load pygame.
+pygame = None
 
 
 SCREEN_WIDTH = 1200
 SCREEN_HEIGHT = 900
-screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
-pygame.display.set_caption("Traffic Junction Simulator - AL2 Priority Lane")
+path_table = PathTable(SCREEN_WIDTH, SCREEN_HEIGHT)
+
+# Queue slots and sprite rotation per lane, from the topology tables
+LANE_LAYOUT = TOPOLOGY.queue_layout(SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2)
+LANE_ROTATION = dict(zip(TOPOLOGY.lanes, TOPOLOGY.rotation))
 
 
 WHITE = (255, 255, 255)
@@ -23,186 +45,96 @@ GRAY = (128, 128, 128)
 DARK_GRAY = (64, 64, 64)
 
 
+# The simulation advances in fixed SIM_DT steps of simulation time,
+# independent of how fast frames are rendered; sim_clock scales both the
+# steps and the control threads by the --speed factor.
+SIM_DT = 1 / 60
+VEHICLE_SPEED = 150  # pixels per second of simulation time
+MAX_STEPS_PER_FRAME = 2000
+FPS = 60
+BATCHED_MOVEMENT = True
+
 paused = False
-move_events = deque()
-clock = pygame.time.Clock()
 running = True
+move_events = deque()
+movement_batch = None
+sim_clock = SimClock()
+# Set by --channel: traffic comes from traffic_generator.py over shared
+# memory instead of this process's own threads.
+event_channel = None
+# Set by --replay: traffic comes from a recorded event_trace file, played
+# back at sim_clock speed from replay_time.
+replay = None
+replay_index = 0
+replay_time = 0.0
+REPLAY_SEEK_STEP = 60
+# Folded state is kept every this many trace records, so a seek replays
+# at most this many records instead of the whole trace up to the target.
+REPLAY_CHECKPOINT_RECORDS = 4096
+replay_checkpoints = []
+accumulator = 0.0
+# Lane version each lane was last laid out at, see update_queue_positions
+laid_out_versions = {}
+# Profiler overlay (--profile); its text is refreshed every
+# PROFILE_REFRESH_FRAMES frames rather than every frame.
+show_profile = False
+PROFILE_REFRESH_FRAMES = 30
+frame_count = 0
+
+# Renderer state, filled in by init_display()
+screen = None
+clock = None
+hud = None
+rotation_cache = None
+dirty_renderer = None
+road_img = None
+background = None
+car1_img = car3_img = None
+LIGHT_RECTS = []
+last_drawn_snapshot = None
+last_drawn_paused = False
 
 
 class Vehicle:
+    # No per-instance __dict__; thousands of these can be on screen.
+    __slots__ = ("lane_id", "vehicle_id", "original_image", "image", "pos", "prev_pos",
+                 "target_pos", "moving", "rotation", "path", "route", "path_index",
+                 "queue_position", "batch_slot", "arrival_time", "departure_time")
+    
     def __init__(self, lane_id, vehicle_id, car_image):
         self.lane_id = lane_id
         self.vehicle_id = vehicle_id
         self.original_image = car_image
         self.image = car_image
         self.pos = list(self.get_queue_position(0))
+        self.prev_pos = None
         self.target_pos = None
         self.moving = False
         self.rotation = self.get_initial_rotation()
-        self.path = []
+        self.path = ()
+        self.route = None
         self.path_index = 0
         self.queue_position = 0
+        self.batch_slot = None
+        self.arrival_time = None
+        self.departure_time = None
         
     def get_initial_rotation(self):
         """Get initial rotation based on lane direction"""
-        if self.lane_id.startswith('A'):  # Coming from top
-            return 180
-        elif self.lane_id.startswith('B'):  # Coming from bottom
-            return 0
-        elif self.lane_id.startswith('C'):  # Coming from right
-            return 270
-        elif self.lane_id.startswith('D'):  # Coming from left
-            return 90
-        return 0
+        return LANE_ROTATION.get(self.lane_id, 0)
     
     def get_queue_position(self, queue_index):
         """Get position in queue based on lane and index"""
-        center_x, center_y = SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2
-        spacing = 45
-        
-        # Lane A 
-        if self.lane_id == "AL1":
-            return (center_x - 45, center_y - 150 - (queue_index * spacing))
-        elif self.lane_id == "AL2":
-            return (center_x, center_y - 150 - (queue_index * spacing))
-        elif self.lane_id == "AL3":
-            return (center_x + 45, center_y - 150 - (queue_index * spacing))
-        
-        # Lane B
-        elif self.lane_id == "BL1":
-            return (center_x + 45, center_y + 150 + (queue_index * spacing))
-        elif self.lane_id == "BL2":
-            return (center_x, center_y + 150 + (queue_index * spacing))
-        elif self.lane_id == "BL3":
-            return (center_x - 45, center_y + 150 + (queue_index * spacing))
-        
-        # Lane C
-        elif self.lane_id == "CL1":
-            return (center_x + 150 + (queue_index * spacing), center_y + 45)
-        elif self.lane_id == "CL2":
-            return (center_x + 150 + (queue_index * spacing), center_y)
-        elif self.lane_id == "CL3":
-            return (center_x + 150 + (queue_index * spacing), center_y - 45)
-        
-        # Lane D 
-        elif self.lane_id == "DL1":
-            return (center_x - 150 - (queue_index * spacing), center_y - 45)
-        elif self.lane_id == "DL2":
-            return (center_x - 150 - (queue_index * spacing), center_y)
-        elif self.lane_id == "DL3":
-            return (center_x - 150 - (queue_index * spacing), center_y + 45)
-        
-        return (center_x, center_y)
+        x, y, dx, dy = LANE_LAYOUT.get(self.lane_id, (SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2, 0, 0))
+        return (x + dx * queue_index, y + dy * queue_index)
     
     def create_path(self, from_lane, to_lane):
-        """Create curved path from source to destination"""
-        center_x, center_y = SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2
-        path = []
-        
-       
-        if from_lane == "AL3" and to_lane == "CL1":
-            start = (center_x + 45, center_y - 150)
-            path = self.create_curve(start, (center_x + 45, center_y - 60), 
-                                    (center_x + 60, center_y + 45), 90)
-            for i in range(40):
-                path.append((center_x + 60 + i * 10, center_y + 45))
-        
- 
-        elif from_lane == "BL3" and to_lane == "DL1":
-            start = (center_x - 45, center_y + 150)
-            path = self.create_curve(start, (center_x - 45, center_y + 60),
-                                    (center_x - 60, center_y - 45), 180)
-            for i in range(40):
-                path.append((center_x - 60 - i * 10, center_y - 45))
-        
-
-        elif from_lane == "CL3" and to_lane == "BL1":
-            start = (center_x + 150, center_y - 45)
-            path = self.create_curve(start, (center_x + 60, center_y - 45),
-                                    (center_x + 45, center_y + 60), 0)
-            for i in range(40):
-                path.append((center_x + 45, center_y + 60 + i * 10))
-        
-        
-        elif from_lane == "DL3" and to_lane == "AL1":
-            start = (center_x - 150, center_y + 45)
-            path = self.create_curve(start, (center_x - 60, center_y + 45),
-                                    (center_x - 45, center_y - 60), 270)
-            for i in range(40):
-                path.append((center_x - 45, center_y - 60 - i * 10))
-        
-       
-        elif from_lane == "AL2" and to_lane == "BL2":
-            start = (center_x, center_y - 150)
-            for i in range(60):
-                path.append((center_x, center_y - 150 + i * 10))
-        
-      
-        elif from_lane == "AL2" and to_lane == "DL2":
-            start = (center_x, center_y - 150)
-            path = self.create_curve(start, (center_x, center_y - 60),
-                                    (center_x - 60, center_y), 180)
-            for i in range(40):
-                path.append((center_x - 60 - i * 10, center_y))
-        
-   
-        elif from_lane == "BL2" and to_lane == "AL2":
-            start = (center_x, center_y + 150)
-            for i in range(60):
-                path.append((center_x, center_y + 150 - i * 10))
-        
-        
-        elif from_lane == "BL2" and to_lane == "CL2":
-            start = (center_x, center_y + 150)
-            path = self.create_curve(start, (center_x, center_y + 60),
-                                    (center_x + 60, center_y), 0)
-            for i in range(40):
-                path.append((center_x + 60 + i * 10, center_y))
-        
-    
-        elif from_lane == "CL2" and to_lane == "DL2":
-            start = (center_x + 150, center_y)
-            for i in range(60):
-                path.append((center_x + 150 - i * 10, center_y))
-        
-    
-        elif from_lane == "CL2" and to_lane == "AL2":
-            start = (center_x + 150, center_y)
-            path = self.create_curve(start, (center_x + 60, center_y),
-                                    (center_x, center_y - 60), 270)
-            for i in range(40):
-                path.append((center_x, center_y - 60 - i * 10))
-        
-
-        elif from_lane == "DL2" and to_lane == "CL2":
-            start = (center_x - 150, center_y)
-            for i in range(60):
-                path.append((center_x - 150 + i * 10, center_y))
-        
-
-        elif from_lane == "DL2" and to_lane == "BL2":
-            start = (center_x - 150, center_y)
-            path = self.create_curve(start, (center_x - 60, center_y),
-                                    (center_x, center_y + 60), 90)
-            for i in range(40):
-                path.append((center_x, center_y + 60 + i * 10))
-        
-        self.path = path if path else [self.pos[:]]
+        """Start moving along the precomputed path for this route"""
+        self.route = path_table.route(from_lane, to_lane)
+        self.path = path_table.paths[self.route]
         self.path_index = 0
         self.moving = True
     
-    def create_curve(self, start, control, end, start_angle):
-        """Create a bezier curve path"""
-        path = []
-        steps = 25
-        for i in range(steps):
-            t = i / steps
-            
-            x = (1-t)**2 * start[0] + 2*(1-t)*t * control[0] + t**2 * end[0]
-            y = (1-t)**2 * start[1] + 2*(1-t)*t * control[1] + t**2 * end[1]
-            path.append((x, y))
-        return path
-    
     def update_rotation_to_path(self):
         """Update rotation based on movement direction"""
         if self.path_index < len(self.path) - 1:
@@ -219,6 +151,7 @@ class Vehicle:
     def update(self):
         """Update vehicle position along path"""
         if self.moving and self.path and self.path_index < len(self.path):
+            self.prev_pos = self.pos[:]
             target = self.path[self.path_index]
             
             dx = target[0] - self.pos[0]
@@ -232,386 +165,459 @@ class Vehicle:
                     return True
                 self.update_rotation_to_path()
             else:
-                speed = 2.5  
+                speed = VEHICLE_SPEED * SIM_DT
                 self.pos[0] += (dx / dist) * speed
                 self.pos[1] += (dy / dist) * speed
         
         return False
     
-    def draw(self, surface):
-        """Draw vehicle with rotation"""
-        self.image = pygame.transform.rotate(self.original_image, self.rotation)
-        rect = self.image.get_rect(center=(int(self.pos[0]), int(self.pos[1])))
-        surface.blit(self.image, rect)
-
-
-class Queue:
-    def __init__(self):
-        self.queue = []
-    
-    def enqueue(self, element):
-        self.queue.append(element)
-    
-    def dequeue(self):
-        return self.queue.pop(0) if self.queue else None
-    
-    def is_empty(self):
-        return len(self.queue) == 0
+    def sprite(self, alpha=1.0):
+        """Rotated image and its rect, alpha of the way from prev_pos to pos"""
+        x, y = self.pos[0], self.pos[1]
+        if self.prev_pos is not None and alpha < 1.0:
+            x = self.prev_pos[0] + (x - self.prev_pos[0]) * alpha
+            y = self.prev_pos[1] + (y - self.prev_pos[1]) * alpha
+        self.image = rotation_cache.get(self.original_image, self.rotation)
+        return self.image, self.image.get_rect(center=(int(x), int(y)))
     
-    def size(self):
-        return len(self.queue)
-    
-    def get_all(self):
-        return self.queue[:]
-
-
-class LanePriorityQueue:
-    def __init__(self):
-        self.heap = []
-        self.counter = 0
-        
-    def push(self, priority, lane_group):
-        heapq.heappush(self.heap, (priority, self.counter, lane_group))
-        self.counter += 1
-    
-    def pop(self):
-        if self.heap:
-            return heapq.heappop(self.heap)[2]
-        return None
-    
-    def is_empty(self):
-        return len(self.heap) == 0
-
-
-lane = {
-    "AL1": Queue(), "AL2": Queue(), "AL3": Queue(),
-    "BL1": Queue(), "BL2": Queue(), "BL3": Queue(),
-    "CL1": Queue(), "CL2": Queue(), "CL3": Queue(),
-    "DL1": Queue(), "DL2": Queue(), "DL3": Queue(),
-}
-
-
-lane_stats = {
-    "AL1": {"passed": 0}, "AL2": {"passed": 0}, "AL3": {"passed": 0},
-    "BL1": {"passed": 0}, "BL2": {"passed": 0}, "BL3": {"passed": 0},
-    "CL1": {"passed": 0}, "CL2": {"passed": 0}, "CL3": {"passed": 0},
-    "DL1": {"passed": 0}, "DL2": {"passed": 0}, "DL3": {"passed": 0},
-}
-
+    def draw(self, surface, alpha=1.0):
+        """Draw vehicle with rotation"""
+        image, rect = self.sprite(alpha)
+        surface.blit(image, rect)
 
-visual_vehicles = {}
-vehicle_id_counter = 0
-last_move_time = {"A": 0, "B": 0, "C": 0, "D": 0}  
 
-LaneA_light = LaneB_light = LaneC_light = LaneD_light = "RED"
 TIME_PER_VEHICLE = 1
-PRIORITY_THRESHOLD = 10
+MIN_GREEN_TIME = 8
+MOVE_HEADWAY = 1.2
 
-def is_priority_active():
-    """Check if AL2 has priority (≥10 vehicles)"""
-    return lane["AL2"].size() >= PRIORITY_THRESHOLD
-
-def calculate_vehicles_to_serve(lanes_to_check):
-    """Calculate average vehicles to serve from normal lanes"""
-    if not lanes_to_check:
-        return 0
-    
-    total_vehicles = sum(lane[l].size() for l in lanes_to_check)
-    n = len(lanes_to_check)
-    vehicles_to_serve = max(1, int(total_vehicles / n))
-    return vehicles_to_serve
+# Lanes, lights, stats and vehicles live in one lock-protected object; see
+# junction_state.py for the concurrency model. The render loop only reads
+# it through snapshots.
+state = JunctionState()
+lane = state.lane
+# Signal controller from controllers.py, set by --controller
+controller = FixedTimeController(MIN_GREEN_TIME, TIME_PER_VEHICLE)
 
 def light_changer():
-    global LaneA_light, LaneB_light, LaneC_light, LaneD_light
-    
+    """Run the phase plan: the signal controller picks each phase and
+    decides how long it stays green"""
     while running:
         if paused:
-            time.sleep(0.2)
+            sim_clock.sleep(0.2)
             continue
         
-        lane_priority_queue = LanePriorityQueue()
-        
-        if is_priority_active():
-            lane_priority_queue.push(0, "AC_PRIORITY")
-        else:
-            lane_priority_queue.push(1, "AC")
+        phase, green_time, rule = state.start_phase(controller, sim_clock.time())
+        if rule is not None:
+            print(f"[PRIORITY] {'/'.join(rule.lanes)} has {rule.count} vehicles")
+        started = sim_clock.time()
         
-        lane_priority_queue.push(1, "BD")
-        
-        while not lane_priority_queue.is_empty():
-            phase = lane_priority_queue.pop()
-            
-            if phase in ["AC", "AC_PRIORITY"]:
-                LaneA_light = LaneC_light = "GREEN"
-                LaneB_light = LaneD_light = "RED"
-                
-                if phase == "AC_PRIORITY":
-                    vehicles_to_serve = lane["AL2"].size()
-                    green_time = max(8, vehicles_to_serve * TIME_PER_VEHICLE)
-                    print(f"[PRIORITY] AL2 has {vehicles_to_serve} vehicles")
-                else:
-                    normal_lanes = ["BL2", "CL2", "DL2"]
-                    vehicles_to_serve = calculate_vehicles_to_serve(normal_lanes)
-                    green_time = max(8, vehicles_to_serve * TIME_PER_VEHICLE)
-                
-                time.sleep(green_time)
-                
-            elif phase == "BD":
-                LaneA_light = LaneC_light = "RED"
-                LaneB_light = LaneD_light = "GREEN"
-                
-                if is_priority_active():
-                    normal_lanes = ["BL3", "CL3", "DL3"]
-                else:
-                    normal_lanes = ["AL2", "BL3", "CL3", "DL3"]
-                
-                vehicles_to_serve = calculate_vehicles_to_serve(normal_lanes)
-                green_time = max(8, vehicles_to_serve * TIME_PER_VEHICLE)
-                
-                time.sleep(green_time)
+        sim_clock.sleep(green_time)
+        profiler.count("light_changer_wakeups")
+        while running:
+            extension = state.extend_phase(controller, sim_clock.time() - started)
+            if not extension:
+                break
+            sim_clock.sleep(extension)
+            profiler.count("light_changer_wakeups")
 
 def generator():
-    global vehicle_id_counter
     i = 0
     
     while running:
         if paused:
-            time.sleep(0.2)
+            sim_clock.sleep(0.2)
             continue
         
-  
-        for l in ["AL3", "BL3", "CL3", "DL3"]:
-            vehicle_id = f"{l}_{vehicle_id_counter}"
-            vehicle_id_counter += 1
-            lane[l].enqueue(vehicle_id)
-            car_img = car1_img if i % 2 == 0 else car3_img
-            visual_vehicles[vehicle_id] = Vehicle(l, vehicle_id, car_img)
-        
-        time.sleep(5)
         
-        
-        for l in ["AL2", "BL2", "CL2", "DL2"]:
-            vehicle_id = f"{l}_{vehicle_id_counter}"
-            vehicle_id_counter += 1
-            lane[l].enqueue(vehicle_id)
-            car_img = car1_img if i % 2 == 0 else car3_img
-            visual_vehicles[vehicle_id] = Vehicle(l, vehicle_id, car_img)
+        # One arrival group (L3 lanes, then L2 lanes) every five seconds
+        for group in TOPOLOGY.arrival_groups:
+            for l in group:
+                car_img = car1_img if i % 2 == 0 else car3_img
+                state.add_vehicle(l, lambda vehicle_id: Vehicle(l, vehicle_id, car_img),
+                                  sim_clock.time())
+            sim_clock.sleep(5)
         
         i += 1
-        time.sleep(5)
+
+def move_vehicle(arm, current_time):
+    """Send the front vehicle of an arm across the junction, in the
+    topology's release order (L3 before L2).
+
+    The vehicle itself is handed to the render loop through move_events,
+    which is the only thread that touches Vehicle objects.
+    """
+    for from_lane in TOPOLOGY.release_order[arm]:
+        if not lane[from_lane].is_empty():
+            break
+    else:
+        return
+    destination = TOPOLOGY.choose(from_lane, random)
+    
+    vehicle_id, vehicle = state.pop_vehicle(from_lane, current_time)
+    if vehicle is not None:
+        move_events.append((vehicle, from_lane, destination))
 
 def traversal():
+    """Release vehicles from green arms, sleeping until something changes"""
     while running:
         if paused:
-            time.sleep(0.2)
+            sim_clock.sleep(0.2)
             continue
         
-        current_time = time.time()
-        moved = False
-        
-    
-        if LaneA_light == "GREEN" and (current_time - last_move_time["A"]) >= 1.2:
+        with state.changed:
+            current_time = sim_clock.time()
+            wait_time = None
             
-            if not lane["AL3"].is_empty():
-                vehicle_id = lane["AL3"].dequeue()
-                lane_stats["AL3"]["passed"] += 1
-                if vehicle_id in visual_vehicles:
-                    visual_vehicles[vehicle_id].create_path("AL3", "CL1")
-                    last_move_time["A"] = current_time
-            elif not lane["AL2"].is_empty():
-                vehicle_id = lane["AL2"].dequeue()
-                lane_stats["AL2"]["passed"] += 1
-                if vehicle_id in visual_vehicles:
-                    
-                    import random
-                    destination = random.choice(["BL2", "DL2"])
-                    visual_vehicles[vehicle_id].create_path("AL2", destination)
-                    last_move_time["A"] = current_time
-        
-        if LaneC_light == "GREEN" and (current_time - last_move_time["C"]) >= 1.2:
-            if not lane["CL3"].is_empty():
-                vehicle_id = lane["CL3"].dequeue()
-                lane_stats["CL3"]["passed"] += 1
-                if vehicle_id in visual_vehicles:
-                    visual_vehicles[vehicle_id].create_path("CL3", "BL1")
-                    last_move_time["C"] = current_time
-            elif not lane["CL2"].is_empty():
-                vehicle_id = lane["CL2"].dequeue()
-                lane_stats["CL2"]["passed"] += 1
-                if vehicle_id in visual_vehicles:
-                    import random
-                    destination = random.choice(["DL2", "AL2"])
-                    visual_vehicles[vehicle_id].create_path("CL2", destination)
-                    last_move_time["C"] = current_time
-        
-       
-        if LaneB_light == "GREEN" and (current_time - last_move_time["B"]) >= 1.2:
-            if not lane["BL3"].is_empty():
-                vehicle_id = lane["BL3"].dequeue()
-                lane_stats["BL3"]["passed"] += 1
-                if vehicle_id in visual_vehicles:
-                    visual_vehicles[vehicle_id].create_path("BL3", "DL1")
-                    last_move_time["B"] = current_time
-            elif not lane["BL2"].is_empty():
-                vehicle_id = lane["BL2"].dequeue()
-                lane_stats["BL2"]["passed"] += 1
-                if vehicle_id in visual_vehicles:
-                    import random
-                    destination = random.choice(["AL2", "CL2"])
-                    visual_vehicles[vehicle_id].create_path("BL2", destination)
-                    last_move_time["B"] = current_time
-        
-        if LaneD_light == "GREEN" and (current_time - last_move_time["D"]) >= 1.2:
-            if not lane["DL3"].is_empty():
-                vehicle_id = lane["DL3"].dequeue()
-                lane_stats["DL3"]["passed"] += 1
-                if vehicle_id in visual_vehicles:
-                    visual_vehicles[vehicle_id].create_path("DL3", "AL1")
-                    last_move_time["D"] = current_time
-            elif not lane["DL2"].is_empty():
-                vehicle_id = lane["DL2"].dequeue()
-                lane_stats["DL2"]["passed"] += 1
-                if vehicle_id in visual_vehicles:
-                    import random
-                    destination = random.choice(["CL2", "BL2"])
-                    visual_vehicles[vehicle_id].create_path("DL2", destination)
-                    last_move_time["D"] = current_time
-        
-        time.sleep(0.1)
-
-
-try:
-    road_img = pygame.image.load("road.png")
-    road_img = pygame.transform.scale(road_img, (SCREEN_WIDTH, SCREEN_HEIGHT))
-except:
-    road_img = None
-
-try:
-    car1_img = pygame.image.load("car1.png")
-    car1_img = pygame.transform.scale(car1_img, (25, 40))
-except:
-    car1_img = pygame.Surface((25, 40))
-    car1_img.fill(RED)
-
-try:
-    car3_img = pygame.image.load("car3.png")
-    car3_img = pygame.transform.scale(car3_img, (25, 40))
-except:
-    car3_img = pygame.Surface((25, 40))
-    car3_img.fill(BLUE)
-
-def draw_junction():
+            for arm in TOPOLOGY.arms:
+                if state.lights[arm] != "GREEN":
+                    continue
+                if all(lane[l].is_empty() for l in TOPOLOGY.release_order[arm]):
+                    continue
+                
+                ready_at = state.last_move_time[arm] + MOVE_HEADWAY
+                if current_time >= ready_at:
+                    move_vehicle(arm, current_time)
+                    ready_at = current_time + MOVE_HEADWAY
+                
+                remaining = ready_at - current_time
+                wait_time = remaining if wait_time is None else min(wait_time, remaining)
+            
+            # Woken early by a light change or an arrival, otherwise by the
+            # headway timer of the arm that is due next.
+            sim_clock.wait(state.changed, wait_time)
+            profiler.count("traversal_wakeups")
+
+
+def load_car_image(path, fallback_color):
+    try:
+        image = pygame.image.load(path)
+        return pygame.transform.scale(image, (25, 40))
+    except Exception:
+        image = pygame.Surface((25, 40))
+        image.fill(fallback_color)
+        return image
+
+def draw_background(surface):
     """Draw the junction and roads"""
     if road_img:
-        screen.blit(road_img, (0, 0))
+        surface.blit(road_img, (0, 0))
     else:
-        screen.fill((34, 139, 34))  
+        surface.fill((34, 139, 34))  
         center_x, center_y = SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2
         
  
-        pygame.draw.rect(screen, DARK_GRAY, (center_x - 70, 0, 140, SCREEN_HEIGHT))
-        pygame.draw.rect(screen, DARK_GRAY, (0, center_y - 70, SCREEN_WIDTH, 140))
+        pygame.draw.rect(surface, DARK_GRAY, (center_x - 70, 0, 140, SCREEN_HEIGHT))
+        pygame.draw.rect(surface, DARK_GRAY, (0, center_y - 70, SCREEN_WIDTH, 140))
         
         
         for i in range(0, SCREEN_HEIGHT, 40):
-            pygame.draw.line(screen, WHITE, (center_x - 45, i), (center_x - 45, i + 20), 2)
-            pygame.draw.line(screen, WHITE, (center_x + 45, i), (center_x + 45, i + 20), 2)
+            pygame.draw.line(surface, WHITE, (center_x - 45, i), (center_x - 45, i + 20), 2)
+            pygame.draw.line(surface, WHITE, (center_x + 45, i), (center_x + 45, i + 20), 2)
         
        
         for i in range(0, SCREEN_WIDTH, 40):
-            pygame.draw.line(screen, WHITE, (i, center_y - 45), (i + 20, center_y - 45), 2)
-            pygame.draw.line(screen, WHITE, (i, center_y + 45), (i + 20, center_y + 45), 2)
-        
-        
-        pygame.draw.rect(screen, GRAY, (center_x - 70, center_y - 70, 140, 140))
-
-def draw_traffic_lights():
-    """Draw traffic light indicators"""
-    center_x, center_y = SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2
-    light_size = 20
-    
-  
-    color = GREEN if LaneA_light == "GREEN" else RED
-    pygame.draw.circle(screen, BLACK, (center_x, center_y - 120), light_size + 3)
-    pygame.draw.circle(screen, color, (center_x, center_y - 120), light_size)
-    
-    
-    color = GREEN if LaneB_light == "GREEN" else RED
-    pygame.draw.circle(screen, BLACK, (center_x, center_y + 120), light_size + 3)
-    pygame.draw.circle(screen, color, (center_x, center_y + 120), light_size)
-    
-  
-    color = GREEN if LaneC_light == "GREEN" else RED
-    pygame.draw.circle(screen, BLACK, (center_x + 120, center_y), light_size + 3)
-    pygame.draw.circle(screen, color, (center_x + 120, center_y), light_size)
-    
-
-    color = GREEN if LaneD_light == "GREEN" else RED
-    pygame.draw.circle(screen, BLACK, (center_x - 120, center_y), light_size + 3)
-    pygame.draw.circle(screen, color, (center_x - 120, center_y), light_size)
-
-def draw_info():
-    """Draw simulation info"""
-    font = pygame.font.Font(None, 20)
-    
- 
-    pygame.draw.rect(screen, (0, 0, 0, 180), (10, 10, 200, 360))
-    
- 
-    header_font = pygame.font.Font(None, 22)
-    header = header_font.render("Lane Stats", True, YELLOW)
-    screen.blit(header, (18, 15))
-    
-    y = 40
-    lanes_order = ["AL1", "AL2", "AL3", "BL1", "BL2", "BL3", 
-                   "CL1", "CL2", "CL3", "DL1", "DL2", "DL3"]
-    
-    for lane_name in lanes_order:
-        waiting = lane[lane_name].size()
-        passed = lane_stats[lane_name]["passed"]
-        
-       
-        if lane_name == "AL2" and is_priority_active():
-            color = YELLOW
-            lane_text = f"►{lane_name}"
-        else:
-            color = WHITE
-            lane_text = f" {lane_name}"
-        
-        text = font.render(f"{lane_text}: W:{waiting} P:{passed}", True, color)
-        screen.blit(text, (18, y))
-        y += 28
-    
-   
-    if is_priority_active():
-        pygame.draw.rect(screen, RED, (SCREEN_WIDTH - 280, 10, 270, 50))
-        priority_font = pygame.font.Font(None, 32)
-        priority_text = priority_font.render("⚠ AL2 PRIORITY ACTIVE", True, YELLOW)
-        screen.blit(priority_text, (SCREEN_WIDTH - 270, 22))
-    
-    
-    control_font = pygame.font.Font(None, 22)
-    controls = control_font.render("SPACE: Pause | ESC: Exit", True, WHITE)
-    screen.blit(controls, (SCREEN_WIDTH - 250, SCREEN_HEIGHT - 30))
+            pygame.draw.line(surface, WHITE, (i, center_y - 45), (i + 20, center_y - 45), 2)
+            pygame.draw.line(surface, WHITE, (i, center_y + 45), (i + 20, center_y + 45), 2)
+        
+        
+        pygame.draw.rect(surface, GRAY, (center_x - 70, center_y - 70, 140, 140))
+
+def init_display(dirty_rects=False):
+    """Open the window and load fonts and images; only needed to render"""
+    global pygame, screen, clock, hud, rotation_cache, dirty_renderer
+    global road_img, background, car1_img, car3_img, LIGHT_RECTS
+    import pygame
+    from sprite_cache import rotation_cache
+    from hud import Hud
+    from dirty_rects import DirtyRectRenderer
+    
+    pygame.init()
+    screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
+    pygame.display.set_caption("Traffic Junction Simulator - AL2 Priority Lane")
+    clock = pygame.time.Clock()
+    hud = Hud(SCREEN_WIDTH, SCREEN_HEIGHT)
+    
+    try:
+        road_img = pygame.image.load("road.png")
+        road_img = pygame.transform.scale(road_img, (SCREEN_WIDTH, SCREEN_HEIGHT))
+    except Exception:
+        road_img = None
+    car1_img = load_car_image("car1.png", RED)
+    car3_img = load_car_image("car3.png", BLUE)
+    
+    # The background never changes, so it is drawn once and blitted as is.
+    background = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT)).convert()
+    draw_background(background)
+    
+    LIGHT_RECTS = [pygame.Rect(x - LIGHT_SIZE - 3, y - LIGHT_SIZE - 3,
+                               2 * LIGHT_SIZE + 7, 2 * LIGHT_SIZE + 7)
+                   for x, y in LIGHT_POSITIONS.values()]
+    dirty_renderer = DirtyRectRenderer(screen, background) if dirty_rects else None
 
-def update_queue_positions():
-    """Update visual positions of vehicles in queues"""
-    for lane_name, queue in lane.items():
-        vehicles_in_queue = queue.get_all()
-        for idx, vehicle_id in enumerate(vehicles_in_queue):
-            if vehicle_id in visual_vehicles and not visual_vehicles[vehicle_id].moving:
-                visual_vehicles[vehicle_id].queue_position = idx
-                visual_vehicles[vehicle_id].pos = list(
-                    visual_vehicles[vehicle_id].get_queue_position(idx)
-                )
+def draw_junction():
+    """Draw the junction and roads"""
+    screen.blit(background, (0, 0))
 
+LIGHT_SIZE = 20
+LIGHT_POSITIONS = {
+    arm: (SCREEN_WIDTH // 2 + dx, SCREEN_HEIGHT // 2 + dy)
+    for arm, (dx, dy) in TOPOLOGY.light.items()
+}
 
-threading.Thread(target=light_changer, daemon=True).start()
-threading.Thread(target=generator, daemon=True).start()
-threading.Thread(target=traversal, daemon=True).start()
+def draw_traffic_lights(snapshot):
+    """Draw traffic light indicators"""
+    for arm, position in LIGHT_POSITIONS.items():
+        color = GREEN if snapshot.lights[arm] == "GREEN" else RED
+        pygame.draw.circle(screen, BLACK, position, LIGHT_SIZE + 3)
+        pygame.draw.circle(screen, color, position, LIGHT_SIZE)
 
+def draw_info(snapshot):
+    """Draw simulation info"""
+    hud.draw(screen, snapshot)
 
-while running:
+def draw_overlay(snapshot):
+    """HUD and pause banner, drawn on top of everything else"""
+    draw_info(snapshot)
+    if show_profile:
+        hud.draw_profile(screen)
+    if paused:
+        hud.draw_paused(screen)
+
+def render_dirty(snapshot, alpha):
+    """Redraw only what changed since the last frame (--dirty-rects)"""
+    global last_drawn_snapshot, last_drawn_paused
+    if paused != last_drawn_paused:
+        dirty_renderer.invalidate()
+        last_drawn_paused = paused
+    # A new snapshot object means a new version or queue averages moved on
+    if snapshot is not last_drawn_snapshot:
+        for rect in LIGHT_RECTS + hud.rects():
+            dirty_renderer.mark(rect)
+        last_drawn_snapshot = snapshot
+
+    sprites = [(vehicle_id, *vehicle.sprite(alpha))
+               for vehicle_id, vehicle in snapshot.vehicles.items()]
+    if not profiler.enabled:
+        dirty_renderer.render(sprites,
+                              lambda: draw_traffic_lights(snapshot),
+                              lambda: draw_overlay(snapshot))
+        return
+
+    # The renderer draws lights and HUD once per dirty region; add the
+    # regions up so the profiler gets one sample per frame.
+    spent = {"draw_traffic_lights": 0.0, "draw_info": 0.0}
+    def timed(name, draw):
+        start = time.perf_counter()
+        draw(snapshot)
+        spent[name] += time.perf_counter() - start
+    dirty_renderer.render(sprites,
+                          lambda: timed("draw_traffic_lights", draw_traffic_lights),
+                          lambda: timed("draw_info", draw_overlay))
+    for name, seconds in spent.items():
+        profiler.record(name, seconds)
+
+def update_queue_positions(snapshot):
+    """Move queued vehicles to their slots, only in lanes that changed"""
+    vehicles = snapshot.vehicles
+    for lane_name, version in snapshot.lane_versions.items():
+        if laid_out_versions.get(lane_name) == version:
+            continue
+        laid_out_versions[lane_name] = version
+        x, y, dx, dy = LANE_LAYOUT[lane_name]
+        for idx, vehicle_id in enumerate(snapshot.queues[lane_name]):
+            vehicle = vehicles.get(vehicle_id)
+            if vehicle is not None and not vehicle.moving:
+                vehicle.queue_position = idx
+                vehicle.pos[0] = x + dx * idx
+                vehicle.pos[1] = y + dy * idx
+
+
+def step_vehicles(snapshot):
+    """Advance every moving vehicle by one SIM_DT step, return finished IDs"""
+    if movement_batch is not None:
+        return movement_batch.step()
+    
+    finished_ids = []
+    for vehicle_id, vehicle in snapshot.vehicles.items():
+        finished = vehicle.update()
+        if finished and vehicle.moving == False:
+            if vehicle.path_index >= len(vehicle.path) - 1:
+                finished_ids.append(vehicle_id)
+    return finished_ids
+
+
+def init_simulation(speed=1.0):
+    """Set the time scale and pick the movement kernel"""
+    global movement_batch
+    sim_clock.set_time_scale(speed)
+    movement_batch = None
+    if BATCHED_MOVEMENT:
+        try:
+            from movement import MovementBatch
+        except ImportError:
+            return
+        movement_batch = MovementBatch(path_table, speed=VEHICLE_SPEED * SIM_DT)
+
+def add_recorded_vehicle(lane_name, number, timestamp):
+    car_img = car1_img if number % 2 == 0 else car3_img
+    state.add_vehicle(lane_name, lambda vehicle_id: Vehicle(lane_name, vehicle_id, car_img),
+                      timestamp)
+
+def apply_event(timestamp, kind, code, to_code, number):
+    """Apply one arrival, move or light change record from another process or a trace"""
+    from shm_channel import ARRIVAL, MOVE, LIGHTS, decode_lights
+    lanes = TOPOLOGY.lanes
+    if kind == ARRIVAL:
+        add_recorded_vehicle(lanes[code], number, timestamp)
+    elif kind == MOVE:
+        vehicle_id, vehicle = state.pop_vehicle(lanes[code], timestamp)
+        if vehicle is not None:
+            move_events.append((vehicle, lanes[code], lanes[to_code]))
+    elif kind == LIGHTS:
+        state.set_lights(decode_lights(code), None, timestamp)
+
+def apply_channel_events():
+    """Mirror the generator process: its arrivals, moves and light changes"""
+    for record in event_channel.receive():
+        apply_event(*record)
+
+def apply_trace_events():
+    """Play back every recorded event up to replay_time"""
+    global replay_index
+    stop = replay.index_at(replay_time)
+    for record in replay.records(replay_index, stop):
+        apply_event(*record)
+    replay_index = stop
+
+def fold_records(queues, passed, metrics, green_arms, start, stop):
+    """Apply trace records start..stop to folded queues, pass counts and metrics.
+
+    queues maps lane names to deques of (number, arrival_time) and
+    metrics is a JunctionMetrics that gets the waits and phases the
+    records imply; returns the green arms after the last light change.
+    """
+    from shm_channel import ARRIVAL, MOVE, LIGHTS, decode_lights
+    lanes = TOPOLOGY.lanes
+    for recorded_at, kind, code, to_code, number in replay.records(start, stop):
+        if kind == ARRIVAL:
+            queues[lanes[code]].append((number, recorded_at))
+        elif kind == MOVE:
+            queue = queues[lanes[code]]
+            if queue:
+                number, arrival_time = queue.popleft()
+                passed[lanes[code]] += 1
+                metrics.departure(lanes[code], recorded_at - arrival_time)
+        elif kind == LIGHTS:
+            green_arms = decode_lights(code)
+            metrics.phase_started("".join(green_arms), recorded_at)
+    return green_arms
+
+def build_replay_checkpoints():
+    """Fold the whole trace once, keeping the state every REPLAY_CHECKPOINT_RECORDS"""
+    lanes = TOPOLOGY.lanes
+    queues = {name: deque() for name in lanes}
+    passed = {name: 0 for name in lanes}
+    metrics = JunctionMetrics(lanes)
+    green_arms = ()
+    replay_checkpoints.clear()
+    # An empty trace still gets the checkpoint at record 0
+    for index in range(0, len(replay) or 1, REPLAY_CHECKPOINT_RECORDS):
+        if index:
+            green_arms = fold_records(queues, passed, metrics, green_arms,
+                                      index - REPLAY_CHECKPOINT_RECORDS, index)
+        replay_checkpoints.append((index, {name: tuple(q) for name, q in queues.items()},
+                                   dict(passed), copy.deepcopy(metrics), green_arms))
+
+def seek_replay(timestamp):
+    """Jump to timestamp in the trace, forwards or backwards.
+
+    The records before timestamp are folded into queue contents, pass
+    counts, wait and phase metrics and lights without creating vehicles
+    or animating moves,
+    starting from the nearest checkpoint before it, so a seek costs the
+    same anywhere in a day-long trace.
+    """
+    global replay_index, replay_time
+    timestamp = min(max(timestamp, 0.0), replay.duration())
+    stop = replay.index_at(timestamp)
+    if not replay_checkpoints:
+        build_replay_checkpoints()
+    start, queues, passed, metrics, green_arms = replay_checkpoints[
+        min(stop // REPLAY_CHECKPOINT_RECORDS, len(replay_checkpoints) - 1)]
+    queues = {name: deque(q) for name, q in queues.items()}
+    passed = dict(passed)
+    metrics = copy.deepcopy(metrics)
+    green_arms = fold_records(queues, passed, metrics, green_arms, start, stop)
+
+    move_events.clear()
+    if movement_batch is not None:
+        movement_batch.clear()
+    state.reset(passed, timestamp, metrics)
+    for lane_name, queued in queues.items():
+        for number, arrival_time in queued:
+            add_recorded_vehicle(lane_name, number, arrival_time)
+    state.set_lights(green_arms)
+    replay_index = stop
+    replay_time = timestamp
+    print(f"[REPLAY] t={timestamp:.0f}s of {replay.duration():.0f}s")
+
+def state_time():
+    """Current time on the clock the junction's events are stamped with"""
+    if replay is not None:
+        return replay_time
+    if event_channel is not None:
+        # The generator stamps its events with the wall clock
+        return time.time()
+    return sim_clock.time()
+
+def start_threads():
+    threading.Thread(target=light_changer, daemon=True).start()
+    threading.Thread(target=generator, daemon=True).start()
+    threading.Thread(target=traversal, daemon=True).start()
+
+def advance(frame_time):
+    """Run the fixed-timestep simulation for frame_time wall seconds.
+
+    Returns the snapshot the frame should be drawn from and the
+    interpolation factor between the last two steps.
+    """
+    global accumulator, replay_time
+    if not paused:
+        accumulator += frame_time * sim_clock.time_scale
+    
+    if event_channel is not None:
+        apply_channel_events()
+    if replay is not None:
+        if not paused:
+            replay_time += frame_time * sim_clock.time_scale
+        apply_trace_events()
+    
+    while move_events:
+        vehicle, from_lane, destination = move_events.popleft()
+        vehicle.create_path(from_lane, destination)
+        if movement_batch is not None:
+            movement_batch.add(vehicle)
+    
+    snapshot = state.snapshot(state_time())
+    with profiler.section("update_queue_positions"):
+        update_queue_positions(snapshot)
+    
+    steps = 0
+    vehicles_to_remove = []
+    with profiler.section("step_vehicles"):
+        while accumulator >= SIM_DT and steps < MAX_STEPS_PER_FRAME:
+            vehicles_to_remove.extend(step_vehicles(snapshot))
+            accumulator -= SIM_DT
+            steps += 1
+    if steps == MAX_STEPS_PER_FRAME:
+        # The box cannot keep up with this speed; drop the backlog rather
+        # than spiral into ever longer frames.
+        accumulator = 0.0
+    state.remove_vehicles(vehicles_to_remove)
+    return snapshot, accumulator / SIM_DT
+
+def handle_events():
+    global running, paused
     for event in pygame.event.get():
         if event.type == pygame.QUIT:
             running = False
@@ -620,38 +626,139 @@ while running:
                 paused = not paused
             elif event.key == pygame.K_ESCAPE:
                 running = False
-    
-
-    update_queue_positions()
-    
-    
-    draw_junction()
-    draw_traffic_lights()
-    
-    vehicles_to_remove = []
-    for vehicle_id, vehicle in visual_vehicles.items():
-        finished = vehicle.update()
-        if finished and vehicle.moving == False:
-            if vehicle.path_index >= len(vehicle.path) - 1:
-                vehicles_to_remove.append(vehicle_id)
-        vehicle.draw(screen)
-    
-   
-    for vid in vehicles_to_remove:
-        visual_vehicles.pop(vid, None)
-    
-    draw_info()
-    
-
-    if paused:
-        font = pygame.font.Font(None, 96)
-        pause_text = font.render("⏸ PAUSED", True, YELLOW)
-        text_rect = pause_text.get_rect(center=(SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2))
-        pygame.draw.rect(screen, BLACK, text_rect.inflate(40, 40))
-        screen.blit(pause_text, text_rect)
-    
-    pygame.display.flip()
-    clock.tick(60)
-
-pygame.quit()
-print("Simulation ended")
\ No newline at end of file
+            elif event.key == pygame.K_p and profiler.enabled:
+                toggle_profile()
+            elif replay is not None and event.key == pygame.K_LEFT:
+                seek_replay(replay_time - REPLAY_SEEK_STEP)
+            elif replay is not None and event.key == pygame.K_RIGHT:
+                seek_replay(replay_time + REPLAY_SEEK_STEP)
+
+def toggle_profile():
+    global show_profile
+    show_profile = not show_profile
+    if dirty_renderer is not None:
+        dirty_renderer.invalidate()
+
+def refresh_profile():
+    """Re-render the profiler overlay text every few frames"""
+    global frame_count
+    frame_count += 1
+    if not show_profile or frame_count % PROFILE_REFRESH_FRAMES:
+        return
+    for rect in hud.set_profile_rows(profiler.rows()):
+        if dirty_renderer is not None:
+            dirty_renderer.mark(rect)
+
+def render(snapshot, alpha):
+    refresh_profile()
+    if dirty_renderer is not None:
+        with profiler.section("render_dirty"):
+            render_dirty(snapshot, alpha)
+        return
+    
+    with profiler.section("draw_junction"):
+        draw_junction()
+    with profiler.section("draw_traffic_lights"):
+        draw_traffic_lights(snapshot)
+    with profiler.section("draw_vehicles"):
+        for vehicle in snapshot.vehicles.values():
+            vehicle.draw(screen, alpha)
+    with profiler.section("draw_info"):
+        draw_overlay(snapshot)
+    with profiler.section("display.flip"):
+        pygame.display.flip()
+
+def run(render_frames=True):
+    """Main loop: step the simulation and, if rendering, draw each frame"""
+    global running
+    previous_frame = time.perf_counter()
+    try:
+        while running:
+            if render_frames:
+                handle_events()
+            
+            now = time.perf_counter()
+            frame_time = min(now - previous_frame, 0.25)
+            previous_frame = now
+            with profiler.section("frame"):
+                snapshot, alpha = advance(frame_time)
+                if render_frames:
+                    render(snapshot, alpha)
+            
+            if render_frames:
+                clock.tick(FPS)
+            else:
+                time.sleep(1 / FPS)
+    except KeyboardInterrupt:
+        pass
+    running = False
+
+def parse_args(argv=None):
+    import argparse
+    parser = argparse.ArgumentParser(description="Traffic junction visualizer")
+    parser.add_argument("--speed", type=float, default=1.0,
+                        help="simulation time acceleration, e.g. 10 or 100")
+    parser.add_argument("--fps", type=int, default=60, help="render frame rate cap")
+    parser.add_argument("--no-render", action="store_true",
+                        help="step the simulation without drawing")
+    parser.add_argument("--dirty-rects", action="store_true",
+                        help="redraw and update only the regions that changed")
+    parser.add_argument("--channel", nargs="?", const="traffic_junction", default=None,
+                        help="take traffic from traffic_generator.py --channel")
+    parser.add_argument("--replay", metavar="TRACE", default=None,
+                        help="play back a trace recorded with engine.py --trace "
+                             "(left/right arrows seek)")
+    parser.add_argument("--seek", type=float, default=0.0,
+                        help="start the replay this many seconds into the trace")
+    parser.add_argument("--controller", choices=sorted(CONTROLLERS), default="fixed",
+                        help="signal controller (see controllers.py)")
+    parser.add_argument("--profile", action="store_true",
+                        help="time each stage of the frame and show the overlay (P toggles)")
+    parser.add_argument("--profile-out", metavar="FILE", default=None,
+                        help="write stage timings and wake-up counters to FILE "
+                             "(.json or .csv) on exit")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    global FPS, event_channel, replay, show_profile, controller
+    args = parse_args(argv)
+    FPS = args.fps
+    if args.controller != "fixed":
+        controller = CONTROLLERS[args.controller]()
+    profiler.enabled = args.profile or args.profile_out is not None
+    show_profile = args.profile and not args.no_render
+    init_simulation(args.speed)
+    if not args.no_render:
+        init_display(args.dirty_rects)
+    
+    if args.channel:
+        from shm_channel import EventChannel
+        try:
+            event_channel = EventChannel.attach(args.channel, TOPOLOGY)
+        except ValueError as error:
+            raise SystemExit(f"[CHANNEL] {error}")
+    elif args.replay:
+        from event_trace import TraceReader
+        try:
+            replay = TraceReader(args.replay, TOPOLOGY)
+        except ValueError as error:
+            raise SystemExit(f"[REPLAY] {error}")
+        build_replay_checkpoints()
+        seek_replay(args.seek)
+    else:
+        start_threads()
+    
+    run(render_frames=not args.no_render)
+    if event_channel is not None:
+        event_channel.close()
+    if replay is not None:
+        replay.close()
+    if args.profile_out:
+        profiler.export(args.profile_out)
+    if not args.no_render:
+        pygame.quit()
+    print("Simulation ended")
+
+
+if __name__ == "__main__":
+    main()
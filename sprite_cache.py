@@ -0,0 +1,44 @@
+"""Cache of rotated car sprites for Vehicle.draw.
+
+Queued vehicles sit at one of four fixed angles, so rotating the source
+image every frame is wasted work. Angles are quantized to a few degrees
+and the least recently used sprites are evicted once the cache is full.
+"""
+from collections import OrderedDict
+
+import pygame
+
+
+class RotationCache:
+    def __init__(self, max_entries=256, angle_step=3):
+        self.max_entries = max_entries
+        self.angle_step = angle_step
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def quantize(self, angle):
+        step = self.angle_step
+        return int(round(angle / step) * step) % 360
+
+    def get(self, image, angle):
+        """Return image rotated by angle, rotating only on a cache miss"""
+        key = (image, self.quantize(angle))
+        rotated = self.entries.get(key)
+        if rotated is not None:
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return rotated
+
+        self.misses += 1
+        rotated = pygame.transform.rotate(image, key[1])
+        self.entries[key] = rotated
+        if len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+        return rotated
+
+    def clear(self):
+        self.entries.clear()
+
+
+rotation_cache = RotationCache()
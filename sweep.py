@@ -0,0 +1,109 @@
+"""Monte Carlo parameter sweep over headless junction runs.
+
+Every combination of the given parameter values is run once per seed on
+a process pool, and one row per run is written to a CSV table:
+
+    python sweep.py --trigger 8 10 12 --deactivate 3 5 --min-green 6 8 \\
+        --arrival-rate 300 450 --seeds 20 --hours 24 --out sweep.csv
+
+Runs are independent, so the sweep scales with the number of cores.
+"""
+import argparse
+import csv
+import itertools
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from engine import JunctionSimulation, INCOMING_LANES
+
+
+def run_one(config):
+    """Run one simulation and flatten its summary into a result row"""
+    sim = JunctionSimulation(
+        seed=config["seed"],
+        priority_threshold=config["priority_threshold"],
+        priority_deactivate_threshold=config["priority_deactivate_threshold"],
+        time_per_vehicle=config["time_per_vehicle"],
+        min_green_time=config["min_green_time"],
+        arrival_rate=config["arrival_rate"],
+    )
+    sim.run(config["hours"] * 3600)
+    result = sim.summary()
+
+    row = dict(config)
+    row["arrived"] = result["arrived"]
+    row["departed"] = result["departed"]
+    row["vehicles_per_hour"] = round(result["vehicles_per_hour"], 3)
+    row["waiting_at_end"] = sum(result["waiting"].values())
+    row["max_queue_AL2"] = result["max_queue"]["AL2"]
+    row["max_queue_other"] = max(result["max_queue"][l] for l in INCOMING_LANES if l != "AL2")
+    row["priority_phases"] = result["priority_phases"]
+    sim_time = result["sim_time"]
+    row["priority_share"] = round(result["priority_time"] / sim_time, 4) if sim_time else 0.0
+    waits = result["waits"]
+    row["wait_p95_AL2"] = round(waits["AL2"]["p95"], 2) if "AL2" in waits else 0.0
+    row["wait_p95_other"] = round(max((waits[l]["p95"] for l in INCOMING_LANES
+                                       if l != "AL2" and l in waits), default=0.0), 2)
+    row["wait_p99_all"] = round(waits["ALL"]["p99"], 2)
+    return row
+
+
+def build_configs(args):
+    configs = []
+    grid = itertools.product(args.trigger, args.deactivate, args.time_per_vehicle,
+                             args.min_green, args.arrival_rate)
+    for trigger, deactivate, per_vehicle, min_green, rate in grid:
+        if deactivate is not None and deactivate >= trigger:
+            continue
+        for seed in range(args.first_seed, args.first_seed + args.seeds):
+            configs.append({
+                "seed": seed,
+                "hours": args.hours,
+                "priority_threshold": trigger,
+                "priority_deactivate_threshold": deactivate,
+                "time_per_vehicle": per_vehicle,
+                "min_green_time": min_green,
+                "arrival_rate": rate,
+            })
+    return configs
+
+
+def optional_int(value):
+    return None if value.lower() == "none" else int(value)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Sweep junction parameters in parallel")
+    parser.add_argument("--trigger", type=int, nargs="+", default=[10],
+                        help="AL2 size that turns priority on (the rule threshold in junction.json)")
+    parser.add_argument("--deactivate", type=optional_int, nargs="+", default=[None],
+                        help="AL2 size that turns priority off, or 'none' for no hysteresis")
+    parser.add_argument("--time-per-vehicle", type=float, nargs="+", default=[1])
+    parser.add_argument("--min-green", type=float, nargs="+", default=[8])
+    parser.add_argument("--arrival-rate", type=float, nargs="+", default=[360],
+                        help="vehicles per hour per incoming lane")
+    parser.add_argument("--seeds", type=int, default=10, help="runs per configuration")
+    parser.add_argument("--first-seed", type=int, default=0)
+    parser.add_argument("--hours", type=float, default=24)
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--out", default="sweep.csv")
+    args = parser.parse_args(argv)
+
+    configs = build_configs(args)
+    start = time.perf_counter()
+    chunksize = max(1, len(configs) // (4 * args.workers))
+    with ProcessPoolExecutor(max_workers=args.workers) as pool:
+        rows = list(pool.map(run_one, configs, chunksize=chunksize))
+    elapsed = time.perf_counter() - start
+
+    if rows:
+        with open(args.out, "w", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=list(rows[0]))
+            writer.writeheader()
+            writer.writerows(rows)
+    print(f"{len(rows)} runs on {args.workers} workers in {elapsed:.1f} s -> {args.out}")
+
+
+if __name__ == "__main__":
+    main()
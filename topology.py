@@ -0,0 +1,176 @@
+"""Junction topology loaded from a config file and compiled into tables.
+
+junction.json describes the junction: its arms, the sub-lanes of each
+arm with their queue slots, the order in which an arm's lanes are served
+on green, the allowed movements with turning weights and crossing
+paths, the signal groups, the phase plan with its priority rules and
+the arrival groups of the fixed generator.
+Topology compiles that once into flat lookup tables, so the engine, the
+simulator threads and the renderer index tables instead of branching on
+lane names, and another layout is a matter of another config file.
+
+Coordinates in the config are relative to the junction centre.
+"""
+import json
+import os
+import zlib
+from collections import namedtuple
+
+
+DEFAULT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "junction.json")
+
+# A phase turns its signal group green for a time set by the average
+# queue on its demand lanes.
+Phase = namedtuple("Phase", "name group demand")
+# While lanes hold threshold vehicles or more, phase becomes the priority
+# phase called name; with deactivate set it stays so until they drain to
+# that many.
+PriorityRule = namedtuple("PriorityRule", "name phase lanes threshold deactivate")
+
+
+def create_curve(start, control, end, steps=25):
+    """Create a bezier curve path"""
+    path = []
+    for i in range(steps):
+        t = i / steps
+        x = (1-t)**2 * start[0] + 2*(1-t)*t * control[0] + t**2 * end[0]
+        y = (1-t)**2 * start[1] + 2*(1-t)*t * control[1] + t**2 * end[1]
+        path.append((x, y))
+    return path
+
+
+class Topology:
+    """Lookup tables compiled from a junction config.
+
+    lanes[code] is a lane name and code[name] its integer code; lane_arm,
+    slot and rotation are indexed by code as well. release_order[arm] is
+    the arm's incoming lanes in the order they are served and light[arm]
+    where its signal head is drawn; destinations
+    and cum_weights give each incoming lane's movements, and routes lists
+    every (from_lane, to_lane) pair with its path spec. phases is the
+    cycle order of the phase plan and priority_rules the rules that can
+    bring a phase forward, with rule_code[name] a rule's index.
+    """
+
+    def __init__(self, config):
+        self.name = config.get("name", "")
+        # Identifies the config in trace and channel headers, whose lane
+        # and arm codes are this topology's indices
+        self.fingerprint = zlib.crc32(json.dumps(config, sort_keys=True).encode())
+        self.queue_spacing = config.get("queue_spacing", 45)
+        self.arms = tuple(config["arms"])
+
+        lanes, lane_arm, slot, rotation, direction = [], [], [], [], []
+        self.release_order = {}
+        self.light = {}
+        for arm, spec in config["arms"].items():
+            self.light[arm] = tuple(spec.get("light", (0, 0)))
+            for sub, position in spec["lanes"].items():
+                lanes.append(arm + sub)
+                lane_arm.append(arm)
+                slot.append(tuple(position))
+                rotation.append(spec.get("rotation", 0))
+                direction.append(tuple(spec["queue_direction"]))
+            self.release_order[arm] = tuple(arm + sub for sub in spec.get("release_order", ()))
+        self.lanes = tuple(lanes)
+        self.code = {name: i for i, name in enumerate(lanes)}
+        self.lane_arm = tuple(lane_arm)
+        self.slot = tuple(slot)
+        self.rotation = tuple(rotation)
+        self.queue_direction = tuple(direction)
+        served = {lane for order in self.release_order.values() for lane in order}
+        self.incoming = tuple(lane for lane in lanes if lane in served)
+
+        destinations, weights = {}, {}
+        self.routes = []
+        self.path_specs = []
+        for move in config["movements"]:
+            destinations.setdefault(move["from"], []).append(move["to"])
+            weights.setdefault(move["from"], []).append(move.get("weight", 1))
+            self.routes.append((move["from"], move["to"]))
+            self.path_specs.append(move["path"])
+        self.routes = tuple(self.routes)
+        self.destinations = {lane: tuple(to) for lane, to in destinations.items()}
+        self.cum_weights = {}
+        for lane, w in weights.items():
+            if len(set(w)) == 1:
+                # Equal weights: choose() uses rng.choice
+                self.cum_weights[lane] = None
+            else:
+                total, cumulative = 0, []
+                for weight in w:
+                    total += weight
+                    cumulative.append(total)
+                self.cum_weights[lane] = tuple(cumulative)
+
+        self.signal_groups = {name: tuple(arms) for name, arms in config["signal_groups"].items()}
+        self.arrival_groups = tuple(tuple(group) for group in config.get("arrival_groups", ()))
+        self.phases = tuple(
+            Phase(p["name"], p["group"], tuple(p.get("demand", ())))
+            for p in config["phases"]
+        )
+        self.priority_rules = tuple(
+            PriorityRule(r["name"], r["phase"], tuple(r["lanes"]), r["threshold"],
+                         r.get("deactivate"))
+            for r in config.get("priority_rules", ())
+        )
+        self.rule_code = {rule.name: i for i, rule in enumerate(self.priority_rules)}
+
+        for lane in self.incoming:
+            if lane not in self.destinations:
+                raise ValueError(f"lane {lane} is served but has no movements")
+        phase_names = {phase.name for phase in self.phases}
+        for phase in self.phases:
+            if phase.group not in self.signal_groups:
+                raise ValueError(f"phase {phase.name} uses unknown signal group {phase.group}")
+            if any(lane not in self.code for lane in phase.demand):
+                raise ValueError(f"phase {phase.name} has an unknown demand lane")
+        for rule in self.priority_rules:
+            if rule.phase not in phase_names:
+                raise ValueError(f"priority rule {rule.name} names unknown phase {rule.phase}")
+            if any(lane not in self.code for lane in rule.lanes):
+                raise ValueError(f"priority rule {rule.name} uses an unknown lane")
+        for from_lane, to_lane in self.routes:
+            if from_lane not in self.code or to_lane not in self.code:
+                raise ValueError(f"movement {from_lane} -> {to_lane} uses an unknown lane")
+
+    def choose(self, lane_name, rng):
+        """Pick the destination of a vehicle leaving lane_name"""
+        destinations = self.destinations[lane_name]
+        if len(destinations) == 1:
+            return destinations[0]
+        cum_weights = self.cum_weights[lane_name]
+        if cum_weights is None:
+            return rng.choice(destinations)
+        return rng.choices(destinations, cum_weights=cum_weights)[0]
+
+    def queue_layout(self, center_x, center_y):
+        """(x, y, dx, dy) per lane: front slot of the queue and the step to the next"""
+        spacing = self.queue_spacing
+        return {
+            name: (center_x + sx, center_y + sy, dx * spacing, dy * spacing)
+            for name, (sx, sy), (dx, dy) in zip(self.lanes, self.slot, self.queue_direction)
+        }
+
+    def build_path(self, route, center_x, center_y):
+        """Points of route's crossing path for a junction centred at (center_x, center_y)"""
+        spec = self.path_specs[route]
+        if "curve" in spec:
+            start, control, end = [(center_x + x, center_y + y) for x, y in spec["curve"]]
+            path = create_curve(start, control, end)
+            x, y = end
+        else:
+            path = []
+            x, y = center_x + spec["start"][0], center_y + spec["start"][1]
+        dx, dy = spec["step"]
+        for i in range(spec["steps"]):
+            path.append((x + i * dx, y + i * dy))
+        return path
+
+
+def load(path=DEFAULT_PATH):
+    with open(path) as f:
+        return Topology(json.load(f))
+
+
+TOPOLOGY = load()
@@ -1,29 +1,18 @@
+import queue
+import sys
 import time
-from collections import deque
 import threading
 import random
+from lane_queue import Queue
 
 paused = False
-move_events = deque()
-
-class Queue:
-    def __init__(self):
-        self.queue = []
-    
-    def enqueue(self, element):
-        self.queue.append(element)
-    
-    def dequeue(self):
-        return self.queue.pop(0) if self.queue else None
-    
-    def is_empty(self):
-        return len(self.queue) == 0
-    
-    def size(self):
-        return len(self.queue)
-    
-    def __iter__(self):
-        return iter(self.queue)
+# Shared-memory channel to the visualizer, opened with --channel
+channel = None
+# Events wait here for the publisher thread, so no caller ever blocks on
+# a full ring buffer while it holds junction_changed.
+OUTBOX_SIZE = 65536
+outbox = queue.Queue(OUTBOX_SIZE)
+dropped_events = 0
 
 lane = {
     "AL1": Queue(), "AL2": Queue(), "AL3": Queue(),
@@ -39,6 +28,41 @@ PRIORITY_DEACTIVATE_THRESHOLD = 5
 
 
 is_priority_on = False 
+last_move_time = {"A": 0, "B": 0, "C": 0, "D": 0}
+junction_changed = threading.Condition()
+
+def set_green(green_arms):
+    """Flip the lights and publish the change under junction_changed, so
+    the visualizer never sees a move on the new green before it"""
+    global LaneA_light, LaneB_light, LaneC_light, LaneD_light
+    with junction_changed:
+        LaneA_light = "GREEN" if "A" in green_arms else "RED"
+        LaneB_light = "GREEN" if "B" in green_arms else "RED"
+        LaneC_light = "GREEN" if "C" in green_arms else "RED"
+        LaneD_light = "GREEN" if "D" in green_arms else "RED"
+        publish("send_lights", green_arms)
+        junction_changed.notify_all()
+
+def publish(method, *args):
+    """Queue an event for the visualizer; drops it if the visualizer has
+    stopped reading and the outbox is full too"""
+    global dropped_events
+    if channel is None:
+        return
+    try:
+        outbox.put_nowait((method, time.time(), args))
+    except queue.Full:
+        dropped_events += 1
+        if dropped_events == 1:
+            print("[GEN] Visualizer is not reading the channel; dropping events")
+
+def publisher():
+    """Move queued events into the ring buffer, waiting while it is full"""
+    while True:
+        method, timestamp, args = outbox.get()
+        send = getattr(channel, method)
+        while not send(timestamp, *args):
+            time.sleep(0.001)
 
 def is_priority_active():
    
@@ -64,8 +88,6 @@ def calculate_vehicles_to_serve(lanes_to_check):
     return vehicles_to_serve
 
 def light_changer():
-    global LaneA_light, LaneB_light, LaneC_light, LaneD_light
-    
     while True:
         if paused:
             time.sleep(0.2)
@@ -74,8 +96,7 @@ def light_changer():
         al2_priority_active = is_priority_active()
         
         
-        LaneA_light = LaneC_light = "GREEN"
-        LaneB_light = LaneD_light = "RED"
+        set_green(("A", "C"))
         
         if al2_priority_active:
             
@@ -92,8 +113,7 @@ def light_changer():
         time.sleep(green_time)
         
        
-        LaneA_light = LaneC_light = "RED"
-        LaneB_light = LaneD_light = "GREEN"
+        set_green(("B", "D"))
         
        
         normal_lanes = ["BL3", "DL3", "BL2", "DL2"]
@@ -111,14 +131,20 @@ def generator():
             continue
         
       
-        for l in ["AL3", "BL3", "CL3", "DL3"]:
-            lane[l].enqueue(f"{l}_{i}")
+        with junction_changed:
+            for l in ["AL3", "BL3", "CL3", "DL3"]:
+                lane[l].enqueue(f"{l}_{i}")
+                publish("send_arrival", l, i)
+            junction_changed.notify_all()
         print(f"[GEN] Added vehicles to L3 lanes: {i}")
         time.sleep(5)
         
         
-        for l in ["AL2", "BL2", "CL2", "DL2"]:
-            lane[l].enqueue(f"{l}_{i}")
+        with junction_changed:
+            for l in ["AL2", "BL2", "CL2", "DL2"]:
+                lane[l].enqueue(f"{l}_{i}")
+                publish("send_arrival", l, i)
+            junction_changed.notify_all()
         print(f"[GEN] Added vehicles to L2 lanes: {i} | AL2 size: {lane['AL2'].size()}")
         i += 1
         time.sleep(5)
@@ -140,78 +166,73 @@ def traversal():
         "DL2": ["CL2", "BL2"], 
     }
 
+    def move_vehicle(arm):
+        l3, l2 = arm + "L3", arm + "L2"
+        if not lane[l3].is_empty():
+            vehicle = lane[l3].dequeue()
+            destination = L3_FLOW[l3]
+            print(f"[MOVE] {vehicle}: {l3} → {destination} (L3 Turn)")
+        else:
+            vehicle = lane[l2].dequeue()
+            destination = random.choice(L2_FLOW[l2])
+            print(f"[MOVE] {vehicle}: {l2} → {destination} (L2 S/R)")
+        from_lane, number = vehicle.rsplit("_", 1)
+        publish("send_move", from_lane, destination, int(number))
+
     while True:
         if paused:
             time.sleep(0.2)
             continue
         
-       
-        if LaneA_light == "GREEN":
-           
-            if not lane["AL3"].is_empty():
-                vehicle = lane["AL3"].dequeue()
-                move_events.append(("AL3", L3_FLOW["AL3"]))
-                print(f"[MOVE] {vehicle}: AL3 → {L3_FLOW['AL3']} (L3 Turn)")
+        with junction_changed:
+            lights = {"A": LaneA_light, "B": LaneB_light, "C": LaneC_light, "D": LaneD_light}
+            current_time = time.time()
+            wait_time = None
             
+            for arm in ["A", "C", "B", "D"]:
+                if lights[arm] != "GREEN":
+                    continue
+                if lane[arm + "L3"].is_empty() and lane[arm + "L2"].is_empty():
+                    continue
+                
+                ready_at = last_move_time[arm] + TIME_PER_VEHICLE
+                if current_time >= ready_at:
+                    move_vehicle(arm)
+                    last_move_time[arm] = current_time
+                    ready_at = current_time + TIME_PER_VEHICLE
+                
+                remaining = ready_at - current_time
+                wait_time = remaining if wait_time is None else min(wait_time, remaining)
             
-            elif not lane["AL2"].is_empty():
-                vehicle = lane["AL2"].dequeue()
-                destination = random.choice(L2_FLOW["AL2"])
-                move_events.append(("AL2", destination))
-                print(f"[MOVE] {vehicle}: AL2 → {destination} (L2 S/R)")
-
-        if LaneC_light == "GREEN":
-           
-            if not lane["CL3"].is_empty():
-                vehicle = lane["CL3"].dequeue()
-                move_events.append(("CL3", L3_FLOW["CL3"]))
-                print(f"[MOVE] {vehicle}: CL3 → {L3_FLOW['CL3']} (L3 Turn)")
-
-           
-            elif not lane["CL2"].is_empty():
-                vehicle = lane["CL2"].dequeue()
-                destination = random.choice(L2_FLOW["CL2"])
-                move_events.append(("CL2", destination))
-                print(f"[MOVE] {vehicle}: CL2 → {destination} (L2 S/R)")
-        
-       
-        if LaneB_light == "GREEN":
-           
-            if not lane["BL3"].is_empty():
-                vehicle = lane["BL3"].dequeue()
-                move_events.append(("BL3", L3_FLOW["BL3"]))
-                print(f"[MOVE] {vehicle}: BL3 → {L3_FLOW['BL3']} (L3 Turn)")
-
-            
-            elif not lane["BL2"].is_empty():
-                vehicle = lane["BL2"].dequeue()
-                destination = random.choice(L2_FLOW["BL2"])
-                move_events.append(("BL2", destination))
-                print(f"[MOVE] {vehicle}: BL2 → {destination} (L2 S/R)")
-        
-        if LaneD_light == "GREEN":
-           
-            if not lane["DL3"].is_empty():
-                vehicle = lane["DL3"].dequeue()
-                move_events.append(("DL3", L3_FLOW["DL3"]))
-                print(f"[MOVE] {vehicle}: DL3 → {L3_FLOW['DL3']} (L3 Turn)")
-
-           
-            elif not lane["DL2"].is_empty():
-                vehicle = lane["DL2"].dequeue()
-                destination = random.choice(L2_FLOW["DL2"])
-                move_events.append(("DL2", destination))
-                print(f"[MOVE] {vehicle}: DL2 → {destination} (L2 S/R)")
-        
-        time.sleep(TIME_PER_VEHICLE)
+            # Woken early by a light change or an arrival, otherwise by the
+            # headway timer of the arm that is due next.
+            junction_changed.wait(wait_time)
 
 
 if __name__ == "__main__":
+    import argparse
+    from shm_channel import EventChannel, DEFAULT_NAME
+    
+    parser = argparse.ArgumentParser(description="Traffic generator")
+    parser.add_argument("--channel", nargs="?", const=DEFAULT_NAME, default=None,
+                        help="publish events to the visualizer over shared memory")
+    args = parser.parse_args()
+    if args.channel:
+        import signal
+        channel = EventChannel.create(args.channel)
+        # Turn SIGTERM into a normal exit so the segment is unlinked below.
+        signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+        print(f"[GEN] Publishing events on shared memory channel '{args.channel}'")
     
     def user_input_handler():
         global paused
         while True:
-            cmd = input("Enter 'p' to pause/unpause: ").strip().lower()
+            try:
+                cmd = input("Enter 'p' to pause/unpause: ").strip().lower()
+            except EOFError:
+                # No terminal attached; keep generating until killed.
+                while True:
+                    time.sleep(3600)
             if cmd == 'p':
                 paused = not paused
                 print(f"Simulation {'PAUSED' if paused else 'RUNNING'}")
@@ -223,6 +244,12 @@ if __name__ == "__main__":
     threading.Thread(target=light_changer, daemon=True).start()
     threading.Thread(target=generator, daemon=True).start()
     threading.Thread(target=traversal, daemon=True).start()
+    if channel is not None:
+        threading.Thread(target=publisher, daemon=True).start()
     
 
-    user_input_handler()
\ No newline at end of file
+    try:
+        user_input_handler()
+    finally:
+        if channel is not None:
+            channel.close()
\ No newline at end of file
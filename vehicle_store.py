@@ -0,0 +1,56 @@
+"""Compact vehicle store for the headless engine.
+
+Vehicles are integer handles into parallel typed arrays (serial number,
+arrival time at the junction and time it entered the road network)
+instead of a string ID plus dict entries each. A finished vehicle's handle goes on a free list and is
+handed to the next arrival, so a long run allocates nothing once the
+store has grown to the largest number of vehicles alive at one time.
+
+About 24 bytes per live vehicle, against roughly 250 for a formatted ID
+string, its dict slot and a boxed arrival time.
+"""
+from array import array
+
+
+class VehicleStore:
+    def __init__(self, capacity=1024):
+        self.serial = array("Q")
+        self.arrival_time = array("d")
+        self.entered_at = array("d")
+        self.free = []
+        self.live = 0
+        self.next_serial = 0
+        self._grow(capacity)
+
+    def __len__(self):
+        return self.live
+
+    def _grow(self, capacity):
+        old = len(self.serial)
+        extra = capacity - old
+        self.serial.extend([0] * extra)
+        self.arrival_time.extend([0.0] * extra)
+        self.entered_at.extend([0.0] * extra)
+        # Popped from the end, so low handles are used first.
+        self.free.extend(range(capacity - 1, old - 1, -1))
+
+    def add(self, arrival_time):
+        """Allocate a vehicle and return its handle.
+
+        entered_at starts as arrival_time; a network overwrites it for
+        vehicles coming from another junction.
+        """
+        if not self.free:
+            self._grow(2 * len(self.serial))
+        handle = self.free.pop()
+        self.serial[handle] = self.next_serial
+        self.arrival_time[handle] = arrival_time
+        self.entered_at[handle] = arrival_time
+        self.next_serial += 1
+        self.live += 1
+        return handle
+
+    def remove(self, handle):
+        """Release a finished vehicle's handle for reuse"""
+        self.free.append(handle)
+        self.live -= 1